@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+# Headless WFC benchmark.
+#
+# Times create_grid plus a full collapse over a matrix of grid sizes, tileset
+# sizes, propagation modes and cell-selection heuristics, and records peak
+# traced memory and how often runs end in a contradiction. Results can be
+# saved as JSON and compared with a run from another commit:
+#
+#   python benchmark.py --sizes 16 64 256 --tiles 4 32 --json new.json
+#   python benchmark.py --heuristics entropy count --json new.json
+#   python benchmark.py --compare old.json new.json
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from core.entropy import HEURISTICS
+from core.tiles import DIRECTIONS, compile_tileset, get_ruleset
+from core.wave import PROPAGATION_MODES, ContradictionError
+from core.wfc import create_grid, run_full_collapse
+
+DEFAULT_SIZES = (16, 32, 64, 128)
+DEFAULT_TILES = (4, 16, 64)
+DEFAULT_MODES = ("worklist", "ac4", "numpy")
+DEFAULT_HEURISTICS = ("entropy",)
+
+
+def synthetic_ruleset(tile_count, density=0.3, seed=0):
+    """Random symmetric tileset; tile_count 4 means the stock TILES.
+
+    Every tile allows itself next to it, so maps stay satisfiable, plus each
+    other tile with probability density per direction.
+    """
+    if tile_count == 4:
+        return get_ruleset()
+    rng = random.Random(seed)
+    names = [f"t{t}" for t in range(tile_count)]
+    tiles = {}
+    for name in names:
+        rules = {}
+        for direction in DIRECTIONS:
+            rules[direction] = {name} | {other for other in names if rng.random() < density}
+        tiles[name] = {"weight": rng.uniform(0.5, 2.0), "rules": rules}
+    return compile_tileset(tiles, closure="union")
+
+
+def run_once(size, ruleset, propagation, heuristic, backtrack, seed):
+    """Seconds taken, and whether the run ended in a contradiction."""
+    start = time.perf_counter()
+    try:
+        grid = create_grid(size, size, ruleset, propagation, heuristic, seed=seed)
+        run_full_collapse(grid, backtrack=backtrack)
+        failed = False
+    except ContradictionError:
+        failed = True
+    return time.perf_counter() - start, failed
+
+
+def peak_memory(size, ruleset, propagation, heuristic, backtrack, seed):
+    """Peak bytes traced by tracemalloc during one run."""
+    tracemalloc.start()
+    try:
+        run_once(size, ruleset, propagation, heuristic, backtrack, seed)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(sizes, tile_counts, modes, backtrack, repeats, seed, memory=True, log=None,
+              heuristics=DEFAULT_HEURISTICS):
+    results = []
+    for tile_count in tile_counts:
+        ruleset = synthetic_ruleset(tile_count, seed=seed)
+        for size in sizes:
+            for propagation in modes:
+                for heuristic in heuristics:
+                    case = {
+                        "size": size,
+                        "tiles": tile_count,
+                        "propagation": propagation,
+                        "heuristic": heuristic,
+                        "backtrack": backtrack,
+                    }
+                    if propagation == "numpy" and tile_count > 64:
+                        case["skipped"] = "numpy propagation supports at most 64 tiles"
+                        results.append(case)
+                        continue
+                    times = []
+                    failures = 0
+                    for k in range(repeats):
+                        elapsed, failed = run_once(size, ruleset, propagation, heuristic,
+                                                   backtrack, seed + k)
+                        times.append(elapsed)
+                        failures += failed
+                    case.update(
+                        runs=repeats,
+                        times=times,
+                        min=min(times),
+                        mean=statistics.fmean(times),
+                        contradiction_rate=failures / repeats,
+                    )
+                    if memory:
+                        case["peak_bytes"] = peak_memory(size, ruleset, propagation, heuristic,
+                                                         backtrack, seed)
+                    results.append(case)
+                    if log is not None:
+                        log(format_case(case))
+    return results
+
+
+def format_case(case):
+    label = (f"{case['size']:>5}x{case['size']:<5} {case['tiles']:>4} tiles  "
+             f"{case['propagation']:<8} {case.get('heuristic', 'entropy'):<8}")
+    if "skipped" in case:
+        return f"{label}  skipped: {case['skipped']}"
+    line = f"{label}  min {case['min']:9.4f}s  mean {case['mean']:9.4f}s  contradictions {case['contradiction_rate']:5.0%}"
+    if "peak_bytes" in case:
+        line += f"  peak {case['peak_bytes'] / 2**20:8.2f} MiB"
+    return line
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(old_path, new_path):
+    """Print the min-time ratio of every case present in both result files."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def key(case):
+        # Results saved before the heuristic axis all used "entropy"
+        return (case["size"], case["tiles"], case["propagation"],
+                case.get("heuristic", "entropy"), case["backtrack"])
+
+    baseline = {key(case): case for case in old["results"] if "min" in case}
+    print(f"{old['environment']['commit']} -> {new['environment']['commit']}")
+    for case in new["results"]:
+        before = baseline.get(key(case))
+        if before is None or "min" not in case:
+            continue
+        speedup = before["min"] / case["min"]
+        print(f"{format_case(case)}  x{speedup:.2f} vs {before['min']:.4f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark WFC generation headlessly.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="square grid sizes (default: %(default)s)")
+    parser.add_argument("--tiles", type=int, nargs="+", default=DEFAULT_TILES,
+                        help="tileset sizes; 4 is the stock tileset (default: %(default)s)")
+    parser.add_argument("--modes", nargs="+", default=DEFAULT_MODES, choices=PROPAGATION_MODES,
+                        help="propagation modes (default: %(default)s)")
+    parser.add_argument("--heuristics", nargs="+", default=DEFAULT_HEURISTICS,
+                        choices=sorted(HEURISTICS),
+                        help="cell-selection heuristics (default: %(default)s)")
+    parser.add_argument("--backtrack", action="store_true", help="collapse with backtracking")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    parser.add_argument("--json", metavar="PATH", help="write results to PATH")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two saved result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = benchmark(args.sizes, args.tiles, args.modes, args.backtrack, args.repeats,
+                        args.seed, memory=not args.no_memory, log=print,
+                        heuristics=args.heuristics)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+        print(f"Results written to {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
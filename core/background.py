@@ -0,0 +1,200 @@
+# core/background.py
+
+# Generate a map off the main thread and stream it in.
+#
+# A worker thread (or process) runs iter_collapse and sends batches of
+# (cell, tile id) updates through a queue; tile id -1 means the cell is not
+# settled yet, which only happens when backtracking undoes a collapse. The
+# main loop calls poll() once per frame to apply whatever has arrived to a
+# StreamedMap, whose unfinished cells read as uncollapsed placeholders.
+
+import multiprocessing
+import queue
+import threading
+
+import numpy as np
+
+from core.cell import Cell, TileCell
+from core.connectivity import connect_walkable
+from core.tiles import Ruleset, get_ruleset
+from core.wave import ContradictionError
+from core.wfc import create_grid, iter_collapse
+
+# Cells sent per queue message
+BATCH_SIZE = 256
+
+# Shared stand-in for cells that have not arrived yet
+PLACEHOLDER = Cell([])
+
+
+def _generate(updates, stop, ruleset, w, h, seed, propagation, heuristic,
+              backtrack, max_backtracks, batch_size, walkable):
+    """Worker body: stream tile ids into updates until done or stopped."""
+    try:
+        grid = create_grid(w, h, ruleset, propagation, heuristic, seed)
+        cells = grid.cells
+        batch = []
+        for changes in iter_collapse(grid, backtrack, max_backtracks):
+            for x, y, options in changes:
+                i = y * w + x
+                mask = cells[i]
+                batch.append((i, mask.bit_length() - 1 if len(options) == 1 else -1))
+            if len(batch) >= batch_size:
+                if stop.is_set():
+                    return
+                updates.put(("cells", batch))
+                batch = []
+        if walkable is not None:
+            for x, y, options in connect_walkable(grid, walkable, max_backtracks=max_backtracks):
+                batch.append((y * w + x, grid.tile_index[options[0]]))
+        updates.put(("cells", batch))
+        updates.put(("done", None))
+    except ContradictionError as e:
+        updates.put(("contradiction", str(e)))
+    except Exception as e:
+        updates.put(("error", f"{type(e).__name__}: {e}"))
+
+
+class StreamedMap:
+    """grid[y][x] view of a map that is still arriving.
+
+    Settled cells read as TileCells and the rest as PLACEHOLDER, which is
+    uncollapsed, so renderers draw it as empty and WFCMapInterface treats
+    it as unwalkable.
+    """
+
+    def __init__(self, w, h, tile_names):
+        self.width = w
+        self.height = h
+        self.tile_names = tuple(tile_names)
+        self.ids = [-1] * (w * h)
+        self._cells = tuple(TileCell(name) for name in self.tile_names)
+
+    def apply(self, updates):
+        """Apply (cell, tile id) updates; returns the (x, y, options) changes."""
+        ids = self.ids
+        width = self.width
+        changes = []
+        for i, t in updates:
+            if ids[i] != t:
+                ids[i] = t
+                changes.append((i % width, i // width, [self.tile_names[t]] if t >= 0 else []))
+        return changes
+
+    def to_array(self):
+        """(h, w) array of tile ids, -1 where a cell has not arrived."""
+        return np.array(self.ids, dtype=np.int32).reshape(self.height, self.width)
+
+    def tile_at(self, x, y):
+        t = self.ids[y * self.width + x]
+        return self.tile_names[t] if t >= 0 else None
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        if y < 0:
+            y += self.height
+        if not 0 <= y < self.height:
+            raise IndexError("map row out of range")
+        return _StreamedRow(self, y)
+
+    def __iter__(self):
+        for y in range(self.height):
+            yield _StreamedRow(self, y)
+
+
+class _StreamedRow:
+    __slots__ = ("map", "y")
+
+    def __init__(self, streamed_map, y):
+        self.map = streamed_map
+        self.y = y
+
+    def __len__(self):
+        return self.map.width
+
+    def __getitem__(self, x):
+        streamed_map = self.map
+        if x < 0:
+            x += streamed_map.width
+        if not 0 <= x < streamed_map.width:
+            raise IndexError("map column out of range")
+        t = streamed_map.ids[self.y * streamed_map.width + x]
+        return streamed_map._cells[t] if t >= 0 else PLACEHOLDER
+
+    def __iter__(self):
+        for x in range(self.map.width):
+            yield self[x]
+
+
+class BackgroundGenerator:
+    """Collapse a w x h map in a worker while the caller keeps running.
+
+    With process=True the worker is a separate process, so generation does
+    not compete with the caller for the GIL; otherwise it is a daemon thread.
+    self.map fills in as poll() is called. walkable is passed on as in
+    run_full_collapse, the bridges arriving with the last batch.
+    """
+
+    def __init__(self, tiles, w, h, seed=None, propagation="worklist", heuristic="entropy",
+                 backtrack=True, max_backtracks=1000, process=False, batch_size=BATCH_SIZE,
+                 walkable=None):
+        self.ruleset = tiles if isinstance(tiles, Ruleset) else get_ruleset(tiles)
+        self.map = StreamedMap(w, h, self.ruleset.names)
+        self.done = False
+        if process:
+            context = multiprocessing.get_context()
+            self._updates = context.Queue()
+            self._stop = context.Event()
+            worker_type = context.Process
+        else:
+            self._updates = queue.Queue()
+            self._stop = threading.Event()
+            worker_type = threading.Thread
+        self._worker = worker_type(
+            target=_generate,
+            args=(self._updates, self._stop, self.ruleset, w, h, seed, propagation,
+                  heuristic, backtrack, max_backtracks, batch_size, walkable),
+            daemon=True
+        )
+        self._worker.start()
+
+    def poll(self, max_messages=None):
+        """Apply updates that have arrived without blocking.
+
+        Returns the changed cells as (x, y, options), ready for
+        WFCMapInterface.update_cells or render_changes. Raises
+        ContradictionError if the worker gave up.
+        """
+        changes = []
+        received = 0
+        while not self.done and (max_messages is None or received < max_messages):
+            try:
+                message = self._updates.get_nowait()
+            except queue.Empty:
+                break
+            received += 1
+            changes.extend(self._handle(*message))
+        return changes
+
+    def wait(self):
+        """Block until the map is complete; returns the changes not yet polled."""
+        changes = []
+        while not self.done:
+            changes.extend(self._handle(*self._updates.get()))
+        return changes
+
+    def _handle(self, kind, payload):
+        if kind == "cells":
+            return self.map.apply(payload)
+        self.done = True
+        if kind == "contradiction":
+            raise ContradictionError(None, None, payload)
+        if kind == "error":
+            raise RuntimeError(f"Map generation failed: {payload}")
+        return []
+
+    def close(self):
+        """Ask the worker to stop early."""
+        self._stop.set()
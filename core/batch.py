@@ -0,0 +1,90 @@
+# core/batch.py
+
+# Generate many small maps at once.
+#
+# All waves live in one (N, tiles, H, W) boolean array. Every step picks the
+# lowest-entropy open cell of each unfinished map, collapses it, and runs
+# one vectorized sweep over the whole batch, so Python overhead is paid once
+# per step instead of once per map.
+
+import numpy as np
+
+from core.cell import TileCell
+from core.tiles import Ruleset, get_ruleset
+from core.vectorized import MAX_TILES, direction_offsets, support_matrices, sweep
+from core.wave import ContradictionError
+
+
+def generate_batch(count, w, h, tiles=None, seed=None, heuristic="entropy", max_restarts=None):
+    """Collapse `count` independent w x h maps together.
+
+    Returns an integer array of tile ids with shape (count, h, w). A map that
+    hits a contradiction is reset and started again; ContradictionError is
+    raised once more than max_restarts resets (default: count) have happened.
+    """
+    ruleset = tiles if isinstance(tiles, Ruleset) else get_ruleset(tiles)
+    tile_count = len(ruleset)
+    if tile_count > MAX_TILES:
+        raise ValueError(f"Batch generation supports at most {MAX_TILES} tiles")
+    if heuristic not in ("entropy", "count"):
+        raise ValueError(f"Unknown heuristic: {heuristic!r}")
+    if max_restarts is None:
+        max_restarts = count
+
+    rng = np.random.default_rng(seed)
+    support = support_matrices(ruleset)
+    offsets = direction_offsets(ruleset)
+    weights = np.array(ruleset.weights)
+    weight_logs = weights * np.log(weights)
+
+    planes = np.ones((count, tile_count, h, w), dtype=bool)
+    sweep(planes, support, offsets)
+    if not planes.any(axis=1).all():
+        raise ContradictionError(None, None, "Tileset cannot fill an empty map")
+    fresh = planes[0].copy()
+
+    restarts = 0
+    while True:
+        counts = planes.sum(axis=1)
+        dead = (counts == 0).reshape(count, -1).any(axis=1)
+        if dead.any():
+            restarts += int(dead.sum())
+            if restarts > max_restarts:
+                raise ContradictionError(None, None, f"Batch exceeded {max_restarts} restarts")
+            planes[dead] = fresh
+            continue
+
+        open_cells = counts > 1
+        active = np.flatnonzero(open_cells.reshape(count, -1).any(axis=1))
+        if active.size == 0:
+            break
+
+        if heuristic == "entropy":
+            sum_w = np.tensordot(weights, planes[active], axes=(0, 1))
+            sum_wlogw = np.tensordot(weight_logs, planes[active], axes=(0, 1))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                entropy = np.log(sum_w) - sum_wlogw / sum_w
+        else:
+            entropy = counts[active].astype(np.float64)
+        entropy += rng.random(entropy.shape) * 1e-6
+        entropy[~open_cells[active]] = np.inf
+        ys, xs = np.divmod(entropy.reshape(active.size, -1).argmin(axis=1), w)
+
+        options = planes[active, :, ys, xs]
+        cumulative = np.where(options, weights, 0.0).cumsum(axis=1)
+        picks = rng.random(active.size) * cumulative[:, -1]
+        chosen = (cumulative > picks[:, None]).argmax(axis=1)
+        planes[active, :, ys, xs] = False
+        planes[active, chosen, ys, xs] = True
+
+        sweep(planes, support, offsets)
+
+    dtype = np.uint8 if tile_count <= 0x100 else np.uint16
+    return planes.argmax(axis=1).astype(dtype)
+
+
+def as_grid(tile_ids, tiles=None):
+    """grid[y][x] of TileCells for one (h, w) map from generate_batch."""
+    ruleset = tiles if isinstance(tiles, Ruleset) else get_ruleset(tiles)
+    names = ruleset.names
+    return [[TileCell(names[t]) for t in row] for row in tile_ids.tolist()]
@@ -1,4 +1,50 @@
 class Cell:
     def __init__(self, options):
         self.collapsed = False
-        self.options = options[:]
\ No newline at end of file
+        self.options = options[:]
+
+
+class CellView:
+    """Cell-like handle onto one entry of a Wave.
+
+    Exposes the same `collapsed` / `options` attributes as Cell so renderers
+    and the critters map interface can keep reading grid[y][x]. Assigning
+    options narrows the cell; it never re-enables a tile.
+    """
+
+    __slots__ = ("wave", "index")
+
+    def __init__(self, wave, index):
+        self.wave = wave
+        self.index = index
+
+    @property
+    def x(self):
+        return self.index % self.wave.width
+
+    @property
+    def y(self):
+        return self.index // self.wave.width
+
+    @property
+    def collapsed(self):
+        return self.wave.is_collapsed(self.index)
+
+    @property
+    def options(self):
+        return self.wave.mask_to_names(self.wave.cells[self.index])
+
+    @options.setter
+    def options(self, names):
+        self.wave.restrict(self.index, self.wave.names_to_mask(names))
+
+
+class TileCell:
+    """Read-only, already collapsed cell holding a single tile name."""
+
+    __slots__ = ("options",)
+
+    collapsed = True
+
+    def __init__(self, name):
+        self.options = [name]
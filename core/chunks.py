@@ -0,0 +1,227 @@
+# core/chunks.py
+
+# Unbounded worlds generated chunk by chunk.
+#
+# Each chunk is a small Wave collapsed on first access. Before collapsing,
+# the border cells of the new chunk are restricted by the tiles already
+# placed along the edges of any generated neighbouring chunks, so seams obey
+# the same rules as the inside of a chunk. Finished chunks only keep their
+# tile ids, in a ChunkStore that can spill to disk.
+
+import os
+import random
+from array import array
+from collections import OrderedDict
+
+from core.cell import TileCell
+from core.rng import derive_seed
+from core.tiles import DIRECTIONS, OPPOSITE, Ruleset, get_ruleset
+from core.wave import ContradictionError, Wave
+from core.wfc import collapse_with_backtracking
+
+
+def tile_typecode(ruleset):
+    """Smallest array typecode that can hold every tile id of ruleset."""
+    return "B" if len(ruleset) <= 0x100 else "H"
+
+
+def generate_patch(ruleset, w, h, constraints, seed, propagation="worklist",
+                   heuristic="entropy", max_backtracks=1000):
+    """Collapse a standalone w x h patch with backtracking.
+
+    constraints is a list of (local index, allowed mask) pairs applied before
+    collapsing. Returns the patch's tile ids in row-major order, or None if
+    it could not be collapsed.
+    """
+    try:
+        grid = Wave(w, h, ruleset, propagation, heuristic, seed)
+        for i, mask in constraints:
+            grid.restrict(i, mask)
+        collapse_with_backtracking(grid, max_backtracks)
+    except ContradictionError:
+        return None
+    return array(tile_typecode(ruleset), (mask.bit_length() - 1 for mask in grid.cells))
+
+
+class ChunkStore:
+    """Tile-id arrays of generated chunks, keyed by chunk coordinates.
+
+    Without a directory every chunk stays in memory. With one, each chunk is
+    also written to disk and only the `max_cached` most recently used chunks
+    are kept in memory.
+    """
+
+    def __init__(self, directory=None, max_cached=256):
+        self.directory = directory
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"chunk_{key[0]}_{key[1]}.bin")
+
+    def __contains__(self, key):
+        if key in self._cache:
+            return True
+        return self.directory is not None and os.path.exists(self._path(key))
+
+    def get(self, key, typecode):
+        tiles = self._cache.get(key)
+        if tiles is not None:
+            self._cache.move_to_end(key)
+            return tiles
+        if self.directory is None or not os.path.exists(self._path(key)):
+            return None
+        tiles = array(typecode)
+        with open(self._path(key), "rb") as f:
+            tiles.frombytes(f.read())
+        self._remember(key, tiles)
+        return tiles
+
+    def put(self, key, tiles):
+        if self.directory is not None:
+            with open(self._path(key), "wb") as f:
+                tiles.tofile(f)
+        self._remember(key, tiles)
+
+    def _remember(self, key, tiles):
+        self._cache[key] = tiles
+        self._cache.move_to_end(key)
+        if self.directory is not None:
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+
+class WorldWindow:
+    """grid[y][x] view of a rectangle of a ChunkedWorld.
+
+    Cells are produced on access, so only the chunks that are actually read
+    (e.g. the ones the renderer does not cull) get generated.
+    """
+
+    def __init__(self, world, x0, y0, w, h):
+        self.world = world
+        self.x0 = x0
+        self.y0 = y0
+        self.width = w
+        self.height = h
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.height:
+            raise IndexError("window row out of range")
+        return _WindowRow(self, y)
+
+    def __iter__(self):
+        for y in range(self.height):
+            yield _WindowRow(self, y)
+
+
+class _WindowRow:
+    __slots__ = ("window", "y")
+
+    def __init__(self, window, y):
+        self.window = window
+        self.y = y
+
+    def __len__(self):
+        return self.window.width
+
+    def __getitem__(self, x):
+        window = self.window
+        if not 0 <= x < window.width:
+            raise IndexError("window column out of range")
+        return TileCell(window.world.tile_at(window.x0 + x, window.y0 + self.y))
+
+    def __iter__(self):
+        for x in range(self.window.width):
+            yield self[x]
+
+
+class ChunkedWorld:
+    """A world of chunk_size x chunk_size chunks generated on demand.
+
+    Chunk (cx, cy) covers world cells [cx * size, (cx + 1) * size) on each
+    axis; coordinates may be negative. Every chunk is collapsed with
+    backtracking under its own seed derived from `seed` and its coordinates.
+    The finished world depends on the order chunks are first requested, since
+    that decides which borders constrain which.
+    """
+
+    def __init__(self, tiles=None, chunk_size=32, seed=None, store=None,
+                 propagation="worklist", heuristic="entropy",
+                 max_backtracks=1000, retries=3):
+        self.ruleset = tiles if isinstance(tiles, Ruleset) else get_ruleset(tiles)
+        self.chunk_size = chunk_size
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.store = store if store is not None else ChunkStore()
+        self.propagation = propagation
+        self.heuristic = heuristic
+        self.max_backtracks = max_backtracks
+        self.retries = retries
+        self.typecode = tile_typecode(self.ruleset)
+
+    def chunk_seed(self, cx, cy, attempt=0):
+        return derive_seed(self.seed, cx, cy, attempt)
+
+    def get_chunk(self, cx, cy):
+        """Tile ids of chunk (cx, cy) in row-major order, generating it if needed."""
+        key = (cx, cy)
+        tiles = self.store.get(key, self.typecode)
+        if tiles is None:
+            tiles = self._generate(cx, cy)
+            self.store.put(key, tiles)
+        return tiles
+
+    def tile_id_at(self, x, y):
+        size = self.chunk_size
+        tiles = self.get_chunk(x // size, y // size)
+        return tiles[(y % size) * size + x % size]
+
+    def tile_at(self, x, y):
+        return self.ruleset.names[self.tile_id_at(x, y)]
+
+    def view(self, x0, y0, w, h):
+        return WorldWindow(self, x0, y0, w, h)
+
+    def _border_constraints(self, cx, cy):
+        """(local index, allowed mask) pairs imposed by generated neighbours."""
+        size = self.chunk_size
+        compat = self.ruleset.compat
+        directions = self.ruleset.directions
+        constraints = []
+        for d, name in enumerate(directions):
+            dx, dy = DIRECTIONS[name]
+            key = (cx + dx, cy + dy)
+            if key not in self.store:
+                continue
+            neighbour = self.store.get(key, self.typecode)
+            # A neighbour tile sees our edge cell in the opposite direction
+            back = directions.index(OPPOSITE[name])
+            for k in range(size):
+                if dx:
+                    x, y = (size - 1 if dx > 0 else 0), k
+                else:
+                    x, y = k, (size - 1 if dy > 0 else 0)
+                nx, ny = (x + dx) % size, (y + dy) % size
+                t = neighbour[ny * size + nx]
+                constraints.append((y * size + x, compat[back][t]))
+        return constraints
+
+    def _generate(self, cx, cy):
+        constraints = self._border_constraints(cx, cy)
+        for attempt in range(self.retries):
+            tiles = generate_patch(
+                self.ruleset, self.chunk_size, self.chunk_size, constraints,
+                self.chunk_seed(cx, cy, attempt), self.propagation,
+                self.heuristic, self.max_backtracks
+            )
+            if tiles is not None:
+                return tiles
+        raise ContradictionError(
+            cx * self.chunk_size, cy * self.chunk_size,
+            f"Could not generate chunk ({cx}, {cy}) against its borders"
+        )
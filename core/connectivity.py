@@ -0,0 +1,185 @@
+# core/connectivity.py
+
+# Keeping every walkable cell of a map reachable from every other.
+#
+# This is a repair pass over a finished map, not a check made during
+# collapse: backtracking can un-collapse cells, which a union-find cannot
+# take back. Walkable cells are grouped by a union-find over 4-connected
+# adjacency, the moves agents make (so periodic maps are not joined across
+# their wrapped edges). While more than one group remains, the cheapest
+# bridge from each smaller group to the largest is found by a 0-1 BFS that
+# counts the blocking cells it crosses, and only the bridge's bounding box is
+# re-collapsed: the blocking cells on the bridge are pinned to a walkable
+# tile, walkable cells are pinned as they are, and the other blocking cells
+# are free. Walkable cells never disappear, so repaired cells are merged
+# into the union-find in place; any islands the free cells form are bridged
+# on the next pass.
+
+import collections
+
+from core.region import recollapse_region
+from core.rng import derive_seed
+from core.topology import get_topology
+from core.wave import ContradictionError
+from core.wfc import is_fully_collapsed
+
+
+class WalkableComponents:
+    """Union-find over the walkable cells of a collapsed wave.
+
+    walkable is a collection of tile names. count is the number of separate
+    walkable regions; add() merges a cell that has just become walkable.
+    """
+
+    def __init__(self, grid, walkable):
+        unknown = [name for name in walkable if name not in grid.tile_index]
+        if unknown:
+            raise ValueError(f"Unknown walkable tiles: {unknown}")
+        self.cells = grid.cells
+        self.walkable_mask = grid.names_to_mask(walkable)
+        self.neighbors = get_topology("square").neighbor_table(grid.width, grid.height)
+        self.parent = list(range(len(self.cells)))
+        # Region size at each root; 0 for cells not added
+        self.size = [0] * len(self.cells)
+        self.count = 0
+        for i in range(len(self.cells)):
+            self.add(i)
+
+    def is_walkable(self, i):
+        mask = self.cells[i]
+        return mask & (mask - 1) == 0 and mask & self.walkable_mask != 0
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i == j:
+            return
+        if self.size[i] < self.size[j]:
+            i, j = j, i
+        self.parent[j] = i
+        self.size[i] += self.size[j]
+        self.count -= 1
+
+    def add(self, i):
+        """Add cell i if it is walkable and not yet added."""
+        if self.size[self.find(i)] or not self.is_walkable(i):
+            return
+        self.size[i] = 1
+        self.count += 1
+        for _, j in self.neighbors[i]:
+            if self.size[self.find(j)]:
+                self.union(i, j)
+
+    def regions(self):
+        """{root: [cells]} for every walkable region, in cell order."""
+        regions = {}
+        for i in range(len(self.cells)):
+            if self.size[self.find(i)]:
+                regions.setdefault(self.find(i), []).append(i)
+        return regions
+
+    def bridge(self, sources, target):
+        """Blocking cells on the cheapest path from sources into target's region."""
+        target = self.find(target)
+        neighbors = self.neighbors
+        dist = dict.fromkeys(sources, 0)
+        came_from = {}
+        queue = collections.deque(sources)
+        while queue:
+            i = queue.popleft()
+            if self.is_walkable(i) and self.find(i) == target:
+                break
+            d = dist[i]
+            for _, j in neighbors[i]:
+                step = 0 if self.is_walkable(j) else 1
+                if d + step < dist.get(j, d + 2):
+                    dist[j] = d + step
+                    came_from[j] = i
+                    if step:
+                        queue.append(j)
+                    else:
+                        queue.appendleft(j)
+        else:
+            return []
+        path = []
+        while i in came_from:
+            if not self.is_walkable(i):
+                path.append(i)
+            i = came_from[i]
+        return path
+
+
+def _bridge_tile(grid, walkable):
+    """The walkable tile that allows the most neighbours."""
+    compat = grid.compat
+    return max(walkable, key=lambda name: sum(
+        rule[grid.tile_index[name]].bit_count() for rule in compat))
+
+
+def connect_walkable(grid, walkable, bridge_tile=None, seed=None, max_backtracks=1000,
+                     map_interface=None):
+    """Join every walkable region of a collapsed wave into one.
+
+    walkable names the tiles agents can cross, e.g. those WFCMapInterface
+    counts as walkable. Bridges are cut with bridge_tile, by default the
+    walkable tile compatible with the most neighbours. Returns the changed
+    cells as (x, y, options), like recollapse_region, and passes them to
+    map_interface.update_cells if given. Raises ContradictionError if the
+    regions cannot all be joined.
+    """
+    if not is_fully_collapsed(grid):
+        raise ValueError("Walkable regions can only be connected on a collapsed wave")
+    components = WalkableComponents(grid, walkable)
+    if components.count <= 1:
+        return []
+    if bridge_tile is None:
+        bridge_tile = _bridge_tile(grid, sorted(walkable, key=grid.tile_index.get))
+
+    width = grid.width
+    cells = grid.cells
+    changes = {}
+    # A re-collapsed box can turn free blocking cells into new walkable
+    # islands, so regions are recomputed after every pass until one is left
+    while components.count > 1:
+        count = components.count
+        regions = components.regions()
+        main = max(regions, key=lambda root: len(regions[root]))
+        for root, members in regions.items():
+            if components.find(root) == components.find(main):
+                continue
+            path = components.bridge(members, main)
+            if not path:
+                i = members[0]
+                raise ContradictionError(i % width, i // width,
+                                         "No bridge joins this walkable region to the rest")
+            xs = [i % width for i in path]
+            ys = [i // width for i in path]
+            x0, y0 = max(0, min(xs) - 1), max(0, min(ys) - 1)
+            x1, y1 = min(grid.width, max(xs) + 2), min(grid.height, max(ys) + 2)
+
+            pins = {(i % width, i // width): bridge_tile for i in path}
+            for y in range(y0, y1):
+                for x in range(x0, x1):
+                    i = y * width + x
+                    if components.is_walkable(i):
+                        pins[(x, y)] = grid.tile_names[cells[i].bit_length() - 1]
+            region_seed = None if seed is None else derive_seed(seed, "bridge", root, count)
+            for x, y, options in recollapse_region(grid, x0, y0, x1 - x0, y1 - y0,
+                                                   region_seed, pins, max_backtracks):
+                i = y * width + x
+                changes[i] = (x, y, options)
+                components.add(i)
+        if components.count >= count:
+            raise ContradictionError(None, None,
+                                     f"Bridging left {components.count} walkable regions")
+
+    changes = [changes[i] for i in sorted(changes)]
+    if map_interface is not None:
+        map_interface.update_cells(changes)
+    return changes
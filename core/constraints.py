@@ -0,0 +1,153 @@
+# core/constraints.py
+
+# Global tile quotas enforced during collapse.
+#
+# Local rules cannot say "10-25% water" or "at most 50 stone", so a quota
+# tracker keeps two running counts per constrained tile: cells collapsed to
+# it and cells where it is still possible. Both are updated from the wave's
+# ban/unban callbacks, so they follow propagation and undo exactly. After
+# every propagation the quotas are checked in O(quotas):
+#   - a tile at its maximum is banned from every other cell,
+#   - a tile with only as many candidate cells as its minimum is forced,
+#   - a quota that can no longer be met is a contradiction, which the
+#     backtracking collapse undoes like any other.
+
+
+def _tile_count(value, cell_count):
+    """A quota bound: ints are cell counts, floats are fractions of the map."""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        return round(value * cell_count)
+    return value
+
+
+class TileQuotas:
+    """Running tile counts and quota enforcement for one wave.
+
+    quotas maps tile names to (min, max); either bound may be None. Attach
+    with add_quotas() rather than constructing directly.
+    """
+
+    def __init__(self, grid, quotas):
+        cell_count = len(grid.cells)
+        self.bounds = []
+        for name, (low, high) in quotas.items():
+            t = grid.tile_index.get(name)
+            if t is None:
+                raise ValueError(f"Quota for unknown tile {name!r}")
+            low = _tile_count(low, cell_count)
+            high = _tile_count(high, cell_count)
+            if low is not None and high is not None and low > high:
+                raise ValueError(f"Quota for {name!r} has min {low} above max {high}")
+            self.bounds.append((t, low, high))
+        self.mask = 0
+        for t, _, _ in self.bounds:
+            self.mask |= 1 << t
+
+        self.recount(grid)
+        # Last cell whose options changed, blamed for quota contradictions
+        self.last = 0
+
+    def recount(self, grid):
+        """Rebuild the running counts from scratch, e.g. after overwrite()."""
+        tile_count = len(grid.tile_names)
+        self.possible = [0] * tile_count
+        self.collapsed = [0] * tile_count
+        for mask in grid.cells:
+            tracked = mask & self.mask
+            while tracked:
+                low = tracked & -tracked
+                self.possible[low.bit_length() - 1] += 1
+                tracked ^= low
+            if mask and mask & (mask - 1) == 0 and mask & self.mask:
+                self.collapsed[mask.bit_length() - 1] += 1
+
+    def banned(self, i, old, mask):
+        """Update counts for cell i shrinking from old to mask."""
+        self.last = i
+        removed = (old & ~mask) & self.mask
+        while removed:
+            low = removed & -removed
+            self.possible[low.bit_length() - 1] -= 1
+            removed ^= low
+        if mask == 0:
+            if old & self.mask and old & (old - 1) == 0:
+                self.collapsed[old.bit_length() - 1] -= 1
+        elif mask & (mask - 1) == 0 and mask & self.mask:
+            self.collapsed[mask.bit_length() - 1] += 1
+
+    def restored(self, i, old, mask):
+        """Update counts for cell i growing back from old to mask."""
+        restored = (mask & ~old) & self.mask
+        while restored:
+            low = restored & -restored
+            self.possible[low.bit_length() - 1] += 1
+            restored ^= low
+        if old == 0:
+            if mask & (mask - 1) == 0 and mask & self.mask:
+                self.collapsed[mask.bit_length() - 1] += 1
+        elif old & (old - 1) == 0 and old & self.mask:
+            self.collapsed[old.bit_length() - 1] -= 1
+
+    def enforce(self, grid):
+        """Apply quota bans to grid; returns False on a contradiction."""
+        cells = grid.cells
+        for t, low, high in self.bounds:
+            bit = 1 << t
+            if high is not None:
+                if self.collapsed[t] > high:
+                    break
+                if self.collapsed[t] == high and self.possible[t] > high:
+                    for i, mask in enumerate(cells):
+                        if mask & bit and mask != bit:
+                            grid.restrict(i, mask & ~bit)
+            if low is not None:
+                if self.possible[t] < low:
+                    break
+                if self.possible[t] == low and self.collapsed[t] < low:
+                    for i, mask in enumerate(cells):
+                        if mask & bit and mask != bit:
+                            grid.restrict(i, bit)
+        else:
+            return grid.contradiction is None
+        if grid.contradiction is None:
+            grid.contradiction = self.last
+        return False
+
+    def satisfied(self):
+        """Whether the collapsed counts meet every quota."""
+        return all((low is None or self.collapsed[t] >= low) and
+                   (high is None or self.collapsed[t] <= high)
+                   for t, low, high in self.bounds)
+
+
+def add_quotas(grid, quotas):
+    """Enforce tile quotas on grid from now on; returns the TileQuotas.
+
+    quotas maps tile names to (min, max) bounds, each an int cell count, a
+    float fraction of the map, or None, e.g. {"water": (0.10, 0.25),
+    "stone": (None, 50)}. Quotas are applied by every propagate(); use
+    backtracking so that choices which make a quota unreachable are undone.
+    """
+    tracker = TileQuotas(grid, quotas)
+    entropy = grid.entropy
+    cells = grid.cells
+    ban = entropy.ban
+    unban = entropy.unban
+
+    def tracked_ban(i, removed):
+        mask = cells[i]
+        tracker.banned(i, mask | removed, mask)
+        ban(i, removed)
+
+    def tracked_unban(i, restored):
+        mask = cells[i]
+        tracker.restored(i, mask & ~restored, mask)
+        unban(i, restored)
+
+    # Instance attributes shadow the index's methods for this wave only
+    entropy.ban = tracked_ban
+    entropy.unban = tracked_unban
+    grid.constraints = tracker
+    return tracker
@@ -0,0 +1,114 @@
+# core/entropy.py
+
+import heapq
+import math
+
+
+class EntropyIndex:
+    """Min-heap of uncollapsed cells keyed by entropy, with lazy deletion.
+
+    Propagation calls ban() whenever a cell's domain shrinks; the old heap
+    entry is left in place and discarded when it reaches the top and no longer
+    matches the cell. Ties are broken by a tiny random noise term stored with
+    each entry, so no candidate list is ever built.
+    """
+
+    def __init__(self, wave):
+        self.wave = wave
+        self.rng = wave.rng
+        cells = wave.cells
+        self.heap = [
+            (self.entropy(i), self.rng.random(), i)
+            for i, mask in enumerate(cells) if mask & (mask - 1)
+        ]
+        heapq.heapify(self.heap)
+
+    def entropy(self, i):
+        return self.wave.cells[i].bit_count()
+
+    def ban(self, i, removed):
+        """Record that the tiles in mask `removed` were banned from cell i."""
+        self.push(i)
+
+    def unban(self, i, restored):
+        """Record that the tiles in mask `restored` are possible again."""
+        self.push(i)
+
+    def push(self, i):
+        mask = self.wave.cells[i]
+        if mask & (mask - 1):
+            heapq.heappush(self.heap, (self.entropy(i), self.rng.random(), i))
+
+    def peek(self):
+        """Index of the lowest-entropy uncollapsed cell, or None."""
+        heap = self.heap
+        cells = self.wave.cells
+        while heap:
+            entropy, _, i = heap[0]
+            mask = cells[i]
+            if mask & (mask - 1) and entropy == self.entropy(i):
+                return i
+            heapq.heappop(heap)
+        return None
+
+
+class WeightedEntropyIndex(EntropyIndex):
+    """EntropyIndex keyed by the Shannon entropy of each cell's tile weights.
+
+    Keeps running sums of w and w*log(w) per cell, so a ban costs O(1) per
+    removed tile and entropy is log(sum_w) - sum_wlogw / sum_w.
+    """
+
+    def __init__(self, wave):
+        self.weights = wave.weights
+        self.weight_logs = [w * math.log(w) if w > 0 else 0.0 for w in self.weights]
+        sums = {}
+        self.sum_weights = []
+        self.sum_weight_logs = []
+        for mask in wave.cells:
+            if mask not in sums:
+                sums[mask] = self._sums(mask)
+            sum_w, sum_wlogw = sums[mask]
+            self.sum_weights.append(sum_w)
+            self.sum_weight_logs.append(sum_wlogw)
+        super().__init__(wave)
+
+    def _sums(self, mask):
+        sum_w = sum_wlogw = 0.0
+        while mask:
+            low = mask & -mask
+            t = low.bit_length() - 1
+            sum_w += self.weights[t]
+            sum_wlogw += self.weight_logs[t]
+            mask ^= low
+        return sum_w, sum_wlogw
+
+    def entropy(self, i):
+        sum_w = self.sum_weights[i]
+        if sum_w <= 0:
+            return 0.0
+        return math.log(sum_w) - self.sum_weight_logs[i] / sum_w
+
+    def ban(self, i, removed):
+        while removed:
+            low = removed & -removed
+            t = low.bit_length() - 1
+            self.sum_weights[i] -= self.weights[t]
+            self.sum_weight_logs[i] -= self.weight_logs[t]
+            removed ^= low
+        self.push(i)
+
+    def unban(self, i, restored):
+        while restored:
+            low = restored & -restored
+            t = low.bit_length() - 1
+            self.sum_weights[i] += self.weights[t]
+            self.sum_weight_logs[i] += self.weight_logs[t]
+            restored ^= low
+        self.push(i)
+
+
+HEURISTICS = {
+    "count": EntropyIndex,
+    "entropy": WeightedEntropyIndex
+}
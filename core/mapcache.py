@@ -0,0 +1,122 @@
+# core/mapcache.py
+
+# On-disk cache of finished maps.
+#
+# Generation is deterministic given the compiled ruleset, the map size, the
+# seed and the engine options, so a digest of those names the result. Maps
+# are stored as map files under that digest; a hit memory-maps the file
+# instead of generating. The directory is kept under a byte budget by
+# evicting the least recently used files, tracked through their mtimes.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from core.mapfile import TileMap, load_map, save_map
+from core.tiles import Ruleset, get_ruleset
+from core.wfc import create_grid, run_full_collapse
+
+# run_full_collapse options that never change the generated map
+_UNKEYED_OPTIONS = ("max_workers", "render_fn")
+
+
+def cache_key(ruleset, w, h, seed, options):
+    """Hex digest naming the map generated from these inputs."""
+    keyed = {k: v for k, v in options.items() if k not in _UNKEYED_OPTIONS}
+    data = json.dumps([ruleset.digest(), w, h, seed, keyed], sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def generate_map(ruleset, w, h, seed, propagation="worklist", heuristic="entropy", **options):
+    """Collapse a fresh w x h map and return it as an in-memory TileMap."""
+    grid = create_grid(w, h, ruleset, propagation, heuristic, seed)
+    run_full_collapse(grid, **options)
+    ids = np.fromiter((mask.bit_length() - 1 for mask in grid.cells), dtype=np.uint16,
+                      count=w * h)
+    return TileMap(ids.reshape(h, w), ruleset.names, ruleset.digest())
+
+
+class MapCache:
+    """Finished maps stored in directory, at most max_bytes in total.
+
+    Only seeded requests are cached; with seed=None every call generates a
+    new map.
+    """
+
+    SUFFIX = ".wfcmap"
+
+    def __init__(self, directory, max_bytes=256 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, tiles, w, h, seed, **options):
+        """The map for these inputs, generated and stored on a miss.
+
+        tiles is a Ruleset or a list of TILES names; options are passed to
+        create_grid (propagation, heuristic) and run_full_collapse.
+        """
+        ruleset = tiles if isinstance(tiles, Ruleset) else get_ruleset(tiles)
+        if seed is None:
+            return generate_map(ruleset, w, h, seed, **options)
+        tile_map = self.find(ruleset, w, h, seed, **options)
+        if tile_map is None:
+            tile_map = generate_map(ruleset, w, h, seed, **options)
+            self.put(tile_map, ruleset, w, h, seed, **options)
+        return tile_map
+
+    def find(self, tiles, w, h, seed, **options):
+        """The cached map for these inputs, or None on a miss."""
+        if seed is None:
+            return None
+        ruleset = tiles if isinstance(tiles, Ruleset) else get_ruleset(tiles)
+        path = self._path(cache_key(ruleset, w, h, seed, options))
+        try:
+            tile_map = load_map(path, ruleset)
+        except (OSError, ValueError):
+            return None
+        # Touch the file so eviction sees it as recently used
+        os.utime(path)
+        return tile_map
+
+    def put(self, grid, tiles, w, h, seed, **options):
+        """Store a map generated elsewhere from these inputs.
+
+        grid is anything save_map accepts, e.g. a collapsed Wave or an
+        (h, w) array of tile ids.
+        """
+        if seed is None:
+            return
+        ruleset = tiles if isinstance(tiles, Ruleset) else get_ruleset(tiles)
+        path = self._path(cache_key(ruleset, w, h, seed, options))
+        temp = f"{path}.{os.getpid()}.tmp"
+        save_map(temp, grid, ruleset)
+        os.replace(temp, path)
+        self.evict()
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def evict(self):
+        """Delete least recently used maps until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
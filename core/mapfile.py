@@ -0,0 +1,148 @@
+# core/mapfile.py
+
+# Compact on-disk format for collapsed maps.
+#
+# A file is an 8-byte magic, a little-endian uint32 header length, a JSON
+# header (size, dtype, tile names, ruleset digest) padded so the data starts
+# on a 64-byte boundary, and then the tile ids as a raw row-major uint8 or
+# uint16 array. Loading memory-maps that array read-only, so a huge map opens
+# instantly and the OS shares its pages between processes.
+
+import json
+import struct
+
+import numpy as np
+
+from core.cell import TileCell
+from core.tiles import Ruleset
+
+MAGIC = b"WFCMAP1\0"
+DATA_ALIGNMENT = 64
+
+
+def _tile_ids(grid, ruleset):
+    """(tile ids of shape (H, W), tile names) for anything save_map accepts."""
+    if isinstance(grid, TileMap):
+        return np.asarray(grid.ids), grid.tile_names
+    if isinstance(grid, np.ndarray):
+        if ruleset is None:
+            raise ValueError("Saving a tile-id array needs its ruleset")
+        return grid, ruleset.names
+    # A Wave: every cell must hold exactly one tile
+    if grid.depth != 1:
+        raise ValueError("Map files hold single-layer maps only")
+    cells = grid.cells
+    for i, mask in enumerate(cells):
+        if mask == 0 or mask & (mask - 1):
+            raise ValueError(f"Cell ({i % grid.width}, {i // grid.width}) is not collapsed")
+    ids = np.fromiter((mask.bit_length() - 1 for mask in cells), dtype=np.int64, count=len(cells))
+    return ids.reshape(grid.height, grid.width), grid.tile_names
+
+
+def save_map(path, grid, ruleset=None):
+    """Write a collapsed map to path.
+
+    grid is a fully collapsed Wave, a TileMap, or an (H, W) array of tile
+    ids (e.g. from generate_batch), which needs its ruleset passed too.
+    """
+    if ruleset is None and not isinstance(grid, (np.ndarray, TileMap)):
+        ruleset = grid.ruleset
+    ids, names = _tile_ids(grid, ruleset)
+    dtype = np.uint8 if len(names) <= 0x100 else np.uint16
+    header = {
+        "width": int(ids.shape[1]),
+        "height": int(ids.shape[0]),
+        "dtype": np.dtype(dtype).str,
+        "tiles": list(names),
+        "ruleset": ruleset.digest() if ruleset is not None else grid.ruleset_digest,
+    }
+    body = json.dumps(header).encode()
+    prefix = len(MAGIC) + 4
+    body += b" " * (-(prefix + len(body)) % DATA_ALIGNMENT)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(body)))
+        f.write(body)
+        f.write(np.ascontiguousarray(ids, dtype=dtype).tobytes())
+
+
+def read_header(path):
+    """(header dict, byte offset of the tile data) of a map file."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a map file")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length))
+    return header, len(MAGIC) + 4 + length
+
+
+def load_map(path, tiles=None, mmap=True):
+    """Open a map file as a TileMap.
+
+    With mmap=True (the default) the tile ids stay on disk and are paged in
+    on access; otherwise they are read into memory. If tiles (a Ruleset) is
+    given, a map saved with a different ruleset raises ValueError.
+    """
+    header, offset = read_header(path)
+    if isinstance(tiles, Ruleset) and tiles.digest() != header["ruleset"]:
+        raise ValueError(f"{path} was generated with a different ruleset")
+    shape = (header["height"], header["width"])
+    dtype = np.dtype(header["dtype"])
+    if mmap:
+        ids = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+    else:
+        ids = np.fromfile(path, dtype=dtype, offset=offset).reshape(shape)
+    return TileMap(ids, header["tiles"], header["ruleset"])
+
+
+class TileMap:
+    """A collapsed map as a 2D tile-id array with a grid[y][x] view.
+
+    Cells read as TileCells, so WFCMapInterface and the renderers take a
+    TileMap wherever they take a collapsed Wave.
+    """
+
+    def __init__(self, ids, tile_names, ruleset_digest=None):
+        self.ids = ids
+        self.tile_names = tuple(tile_names)
+        self.ruleset_digest = ruleset_digest
+        self.height, self.width = ids.shape
+        # Cells are read-only, so one shared TileCell per tile is enough
+        self._cells = tuple(TileCell(name) for name in self.tile_names)
+
+    def tile_at(self, x, y):
+        return self.tile_names[self.ids[y, x]]
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        if y < 0:
+            y += self.height
+        if not 0 <= y < self.height:
+            raise IndexError("map row out of range")
+        return _TileMapRow(self, y)
+
+    def __iter__(self):
+        for y in range(self.height):
+            yield _TileMapRow(self, y)
+
+
+class _TileMapRow:
+    __slots__ = ("tile_map", "y")
+
+    def __init__(self, tile_map, y):
+        self.tile_map = tile_map
+        self.y = y
+
+    def __len__(self):
+        return self.tile_map.width
+
+    def __getitem__(self, x):
+        tile_map = self.tile_map
+        return tile_map._cells[tile_map.ids[self.y, x]]
+
+    def __iter__(self):
+        cells = self.tile_map._cells
+        for t in self.tile_map.ids[self.y].tolist():
+            yield cells[t]
@@ -0,0 +1,155 @@
+# core/overlapping.py
+
+# Overlapping-model WFC: tiles learned from a sample image.
+#
+# Every n x n window of the sample (optionally with its rotations and
+# reflections) is a pattern. Identical patterns are merged and weighted by
+# how often they occur. Two patterns may sit next to each other when they
+# agree on the (n - 1) x n strip where they overlap. The result is an
+# ordinary Ruleset, so the usual Wave and propagation modes collapse it; each
+# output cell then takes the colour of its pattern's top-left pixel.
+
+import numpy as np
+
+from core.tiles import DIRECTIONS, Ruleset
+
+# Symmetry levels: how many of the 8 rotations/reflections of each window
+# are added to the pattern set (1 = as sampled, 2 = plus mirror, 8 = all)
+SYMMETRIES = (1, 2, 4, 8)
+
+
+def load_sample(path):
+    """Read an image into (colour ids of shape (H, W), palette of RGBA tuples)."""
+    from PIL import Image
+
+    pixels = np.asarray(Image.open(path).convert("RGBA"))
+    return index_colours(pixels)
+
+
+def index_colours(pixels):
+    """Map an (H, W, C) pixel array to (colour ids (H, W), palette)."""
+    height, width = pixels.shape[:2]
+    flat = pixels.reshape(height * width, -1)
+    palette, ids = np.unique(flat, axis=0, return_inverse=True)
+    return ids.reshape(height, width), [tuple(int(c) for c in colour) for colour in palette]
+
+
+def _variants(windows, symmetry):
+    """windows (K, n, n) plus their first `symmetry` rotations/reflections."""
+    variants = []
+    rotated = windows
+    for k in range(4):
+        if len(variants) >= symmetry:
+            break
+        variants.append(rotated)
+        if len(variants) < symmetry:
+            variants.append(rotated[:, :, ::-1])
+        rotated = np.rot90(rotated, axes=(1, 2))
+    return np.concatenate(variants[:symmetry])
+
+
+def _unique_rows(rows):
+    """(unique rows, inverse, counts), comparing each row's bytes as one key."""
+    rows = np.ascontiguousarray(rows)
+    keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+    _, first, inverse, counts = np.unique(keys, return_index=True, return_inverse=True,
+                                          return_counts=True)
+    return rows[first], inverse.ravel(), counts
+
+
+def extract_patterns(sample, n=3, symmetry=8, periodic=False):
+    """Distinct n x n patterns of a 2D array of colour ids and their counts.
+
+    With periodic=True the sample wraps around, so windows crossing its
+    right and bottom edges are included. Returns (patterns of shape (K, n, n),
+    counts of shape (K,)).
+    """
+    if n < 2:
+        raise ValueError("Pattern size must be at least 2")
+    if symmetry not in SYMMETRIES:
+        raise ValueError(f"symmetry must be one of {SYMMETRIES}")
+    sample = np.asarray(sample)
+    if sample.ndim != 2:
+        raise ValueError("Sample must be a 2D array of colour ids")
+    if periodic:
+        sample = np.pad(sample, ((0, n - 1), (0, n - 1)), mode="wrap")
+    if sample.shape[0] < n or sample.shape[1] < n:
+        raise ValueError(f"Sample is smaller than the {n}x{n} pattern size")
+
+    windows = np.lib.stride_tricks.sliding_window_view(sample, (n, n)).reshape(-1, n, n)
+    windows = _variants(windows, symmetry)
+    patterns, _, counts = _unique_rows(windows.reshape(len(windows), n * n))
+    return patterns.reshape(-1, n, n), counts
+
+
+def overlap_compat(patterns, directions=None):
+    """compat[d][t] bitmasks: patterns that may lie in direction d of pattern t.
+
+    Pattern b may sit one cell in direction (dx, dy) of pattern a when a
+    shifted by (dx, dy) agrees with b wherever the two overlap. The strips
+    of every pattern are interned to ids, so each direction is a single
+    broadcast comparison instead of a loop over pattern pairs.
+    """
+    directions = tuple(directions or DIRECTIONS)
+    count, n = patterns.shape[:2]
+    compat = []
+    for name in directions:
+        dx, dy = DIRECTIONS[name]
+        # The part of a covered by b, and the same pixels in b's coordinates
+        strip_a = patterns[:, max(0, dy):n + min(0, dy), max(0, dx):n + min(0, dx)]
+        strip_b = patterns[:, max(0, -dy):n + min(0, -dy), max(0, -dx):n + min(0, -dx)]
+        strips = np.concatenate([strip_a, strip_b]).reshape(2 * count, -1)
+        _, strip_ids, _ = _unique_rows(strips)
+        allowed = strip_ids[:count, None] == strip_ids[None, count:]
+        packed = np.packbits(allowed, axis=1, bitorder="little")
+        compat.append([int.from_bytes(row.tobytes(), "little") for row in packed])
+    return compat
+
+
+class OverlappingModel:
+    """Patterns learned from a sample, compiled into a Ruleset.
+
+    Build a Wave from model.ruleset (the "ac4" or "numpy" propagation modes
+    suit overlapping models best, since they keep full arc consistency) and
+    turn the collapsed wave into colours with to_image().
+    """
+
+    def __init__(self, sample, n=3, symmetry=8, periodic=True, palette=None):
+        self.n = n
+        self.palette = palette
+        self.patterns, self.counts = extract_patterns(sample, n, symmetry, periodic)
+        names = [f"p{t}" for t in range(len(self.patterns))]
+        compat = overlap_compat(self.patterns)
+        self.ruleset = Ruleset(names, self.counts.tolist(), compat, tuple(DIRECTIONS))
+
+    @classmethod
+    def from_image(cls, path, n=3, symmetry=8, periodic=True):
+        ids, palette = load_sample(path)
+        return cls(ids, n, symmetry, periodic, palette)
+
+    def pattern_ids(self, grid):
+        """(H, W) array of the pattern id collapsed into each cell of grid."""
+        ids = [mask.bit_length() - 1 if mask and not mask & (mask - 1) else -1
+               for mask in grid.cells]
+        return np.array(ids).reshape(grid.height, grid.width)
+
+    def to_image(self, grid):
+        """Colour ids of the output, or RGBA pixels if a palette is known.
+
+        The output is (H + n - 1, W + n - 1): every cell contributes its
+        pattern's top-left pixel, and the last row and column of cells
+        contribute their whole pattern so the edges are complete.
+        """
+        ids = self.pattern_ids(grid)
+        if (ids < 0).any():
+            raise ValueError("Wave is not fully collapsed")
+        n = self.n
+        height, width = ids.shape
+        out = np.empty((height + n - 1, width + n - 1), dtype=self.patterns.dtype)
+        out[:height, :width] = self.patterns[ids, 0, 0]
+        out[height - 1:, :width] = self.patterns[ids[-1], :, 0].T
+        out[:height, width - 1:] = self.patterns[ids[:, -1], 0, :]
+        out[height - 1:, width - 1:] = self.patterns[ids[-1, -1]]
+        if self.palette is None:
+            return out
+        return np.array(self.palette, dtype=np.uint8)[out]
@@ -0,0 +1,178 @@
+# core/parallel.py
+
+# Multi-core generation of one large grid.
+#
+# The grid is cut into square tiles coloured like a checkerboard. Black tiles
+# only touch each other at corners, which 4-connected rules ignore, so they
+# are all collapsed at once in worker processes. White tiles are then
+# collapsed concurrently against the black tiles around them. A white tile
+# whose borders cannot be satisfied is handled by the seam pass, which
+# re-collapses it together with a growing margin of its neighbours until the
+# seams agree. The results are finally stitched back into the grid.
+
+from concurrent.futures import ProcessPoolExecutor
+
+from core.chunks import generate_patch
+from core.rng import derive_seed
+from core.wave import ContradictionError
+from core.wfc import propagate
+
+
+def patch_constraints(grid, base, tiles, x0, y0, w, h, narrowed=None):
+    """(local index, mask) pairs for the patch, or None if one is impossible.
+
+    Each cell starts from its mask in base and is narrowed by every already
+    placed tile just outside the patch, which only the one-cell border ring
+    can touch. narrowed lists the interior cells whose base mask may not be
+    full; by default every interior cell is checked.
+    """
+    width = grid.width
+    full = grid.full_mask
+    compat = grid.compat
+    opposite = grid.opposite
+    neighbors = grid.neighbors
+    x1, y1 = x0 + w, y0 + h
+    masks = {}
+    for ly in range(h):
+        # Every cell of the top and bottom rows, else the two end columns
+        columns = range(w) if ly == 0 or ly == h - 1 else (0, w - 1) if w > 1 else (0,)
+        for lx in columns:
+            i = (y0 + ly) * width + x0 + lx
+            mask = base[i]
+            for d, j in neighbors[i]:
+                jx, jy = j % width, j // width
+                if x0 <= jx < x1 and y0 <= jy < y1:
+                    continue
+                t = tiles[j]
+                if t >= 0:
+                    mask &= compat[opposite[d]][t]
+            if mask == 0:
+                return None
+            if mask != full:
+                masks[ly * w + lx] = mask
+
+    if narrowed is None:
+        narrowed = [(y0 + ly) * width + x0 + lx
+                    for ly in range(1, h - 1) for lx in range(1, w - 1)]
+    for i in narrowed:
+        mask = base[i]
+        if mask != full:
+            k = (i // width - y0) * w + i % width - x0
+            masks.setdefault(k, mask)
+    return sorted(masks.items())
+
+
+def _place(grid, tiles, patch, x0, y0, w, h):
+    width = grid.width
+    for ly in range(h):
+        row = (y0 + ly) * width + x0
+        tiles[row:row + w] = patch[ly * w:(ly + 1) * w]
+
+
+def collapse_parallel(grid, tile_size=64, seed=None, max_workers=None, max_backtracks=1000):
+    """Collapse grid in place using a checkerboard of worker processes.
+
+    Cells already narrowed in grid (e.g. pinned tiles) are respected. The
+    same seed gives the same map regardless of worker count; without one, a
+    seed is drawn from grid.rng. Raises
+    ContradictionError if the seam pass cannot reconcile a tile.
+    """
+    if grid.topology.name != "square" or grid.depth != 1:
+        raise ValueError("Parallel generation supports only the square topology")
+    if seed is None:
+        seed = grid.rng.getrandbits(64)
+    if not propagate(grid):
+        raise ContradictionError(grid.contradiction % grid.width,
+                                 grid.contradiction // grid.width)
+
+    width, height = grid.width, grid.height
+    base = grid.cells[:]
+    tiles = [-1] * (width * height)
+    rects = {}
+    for ty in range(0, height, tile_size):
+        for tx in range(0, width, tile_size):
+            rects[(tx // tile_size, ty // tile_size)] = (
+                tx, ty, min(tile_size, width - tx), min(tile_size, height - ty))
+    # Cells already narrowed (pins, edge effects), bucketed by tile
+    narrowed = {key: [] for key in rects}
+    full = grid.full_mask
+    for i, mask in enumerate(base):
+        if mask != full:
+            narrowed[(i % width // tile_size, i // width // tile_size)].append(i)
+
+    def patch_seed(key, attempt=0):
+        return derive_seed(seed, key, attempt)
+
+    failed = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for colour in (0, 1):
+            jobs = {}
+            for key, (x0, y0, w, h) in rects.items():
+                if (key[0] + key[1]) % 2 != colour:
+                    continue
+                constraints = patch_constraints(grid, base, tiles, x0, y0, w, h,
+                                                narrowed[key])
+                if constraints is None:
+                    failed.append(key)
+                    continue
+                jobs[key] = executor.submit(
+                    generate_patch, grid.ruleset, w, h, constraints, patch_seed(key),
+                    grid.propagation, grid.heuristic, max_backtracks
+                )
+            for key, future in jobs.items():
+                patch = future.result()
+                if patch is None:
+                    failed.append(key)
+                else:
+                    _place(grid, tiles, patch, *rects[key])
+
+    for key in failed:
+        _reconcile_seams(grid, base, tiles, rects[key], tile_size,
+                         patch_seed(key, 1), max_backtracks)
+
+    # Every patch already agrees with its surroundings, so the tile ids are
+    # written straight in rather than restricted and propagated cell by cell
+    cells = grid.cells
+    if grid.propagation == "ac4":
+        # overwrite() also recounts the support counters around each change
+        grid.overwrite([(i, 1 << t) for i, t in enumerate(tiles) if cells[i] != 1 << t])
+        return
+    ban = grid.entropy.ban
+    for i, t in enumerate(tiles):
+        old = cells[i]
+        if old != 1 << t:
+            cells[i] = 1 << t
+            ban(i, old & ~(1 << t))
+
+
+def _reconcile_seams(grid, base, tiles, rect, tile_size, seed, max_backtracks):
+    """Re-collapse a failed tile with a growing margin around it."""
+    x0, y0, w, h = rect
+    margin = max(1, tile_size // 8)
+    attempt = 0
+    while True:
+        ex0 = max(0, x0 - margin)
+        ey0 = max(0, y0 - margin)
+        ex1 = min(grid.width, x0 + w + margin)
+        ey1 = min(grid.height, y0 + h + margin)
+        ew, eh = ex1 - ex0, ey1 - ey0
+
+        saved = [tiles[(ey0 + ly) * grid.width + ex0:(ey0 + ly) * grid.width + ex1]
+                 for ly in range(eh)]
+        _place(grid, tiles, [-1] * (ew * eh), ex0, ey0, ew, eh)
+        constraints = patch_constraints(grid, base, tiles, ex0, ey0, ew, eh)
+        patch = None
+        if constraints is not None:
+            patch = generate_patch(grid.ruleset, ew, eh, constraints, seed + attempt,
+                                   grid.propagation, grid.heuristic, max_backtracks)
+        if patch is not None:
+            _place(grid, tiles, patch, ex0, ey0, ew, eh)
+            return
+
+        for ly, row in enumerate(saved):
+            start = (ey0 + ly) * grid.width + ex0
+            tiles[start:start + ew] = row
+        if ex0 == 0 and ey0 == 0 and ex1 == grid.width and ey1 == grid.height:
+            raise ContradictionError(x0, y0, f"Could not reconcile seams around ({x0}, {y0})")
+        margin *= 2
+        attempt += 1
@@ -0,0 +1,118 @@
+# core/region.py
+
+# Pinning tiles and re-generating part of an existing map.
+#
+# A region is re-collapsed as a standalone patch whose border cells are
+# restricted by the tiles just outside it, exactly like a chunk or a
+# parallel tile, and the result is written back into the wave. Only the
+# region and its one-cell ring are read, so the cost follows the region size
+# rather than the map size.
+
+from core.chunks import generate_patch
+from core.parallel import patch_constraints
+from core.rng import derive_seed
+from core.wave import ContradictionError
+from core.wfc import propagate
+
+
+class _CollapsedIds:
+    """tiles[i] view of a wave: the tile id of a collapsed cell, else -1."""
+
+    __slots__ = ("cells",)
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    def __getitem__(self, i):
+        mask = self.cells[i]
+        if mask and mask & (mask - 1) == 0:
+            return mask.bit_length() - 1
+        return -1
+
+
+def _pin_masks(grid, pins):
+    """{cell index: mask} for a {(x, y): tile name} mapping."""
+    masks = {}
+    for (x, y), name in pins.items():
+        if not (0 <= x < grid.width and 0 <= y < grid.height):
+            raise ValueError(f"Pinned cell ({x}, {y}) is outside the map")
+        t = grid.tile_index.get(name)
+        if t is None:
+            raise ValueError(f"Unknown tile {name!r} pinned at ({x}, {y})")
+        masks[y * grid.width + x] = 1 << t
+    return masks
+
+
+def pin_tiles(grid, pins):
+    """Fix cells to tiles before generation.
+
+    pins maps (x, y) to a tile name. The pins are propagated straight away,
+    so ContradictionError is raised here if they cannot all hold.
+    """
+    for i, mask in _pin_masks(grid, pins).items():
+        grid.restrict(i, mask)
+    if not propagate(grid):
+        i = grid.contradiction
+        raise ContradictionError(i % grid.width, i // grid.width)
+
+
+def recollapse_region(grid, x0, y0, w, h, seed=None, pins=None, max_backtracks=1000,
+                      retries=3, map_interface=None):
+    """Re-generate the w x h rectangle at (x0, y0) of a collapsed wave.
+
+    Cells outside the rectangle are kept and constrain its border; pins
+    ((x, y) -> tile name, inside the rectangle) are honoured too. Returns
+    the changed cells as (x, y, options) in the same form as iter_collapse,
+    and passes them to map_interface.update_cells if given. Raises
+    ContradictionError, leaving the wave untouched, if no retry fits.
+    """
+    if grid.topology.name not in ("square", "periodic") or grid.depth != 1:
+        raise ValueError("Regions can only be re-collapsed on square grids")
+    x1, y1 = min(grid.width, x0 + w), min(grid.height, y0 + h)
+    x0, y0 = max(0, x0), max(0, y0)
+    w, h = x1 - x0, y1 - y0
+    if w <= 0 or h <= 0:
+        return []
+    if grid.topology.periodic and (w == grid.width or h == grid.height):
+        # The patch would have to wrap onto itself
+        raise ValueError("A region may not span a whole periodic axis")
+    if seed is None:
+        seed = grid.rng.getrandbits(64)
+
+    base = {i: grid.full_mask for i in _region_cells(grid, x0, y0, w, h)}
+    for i, mask in _pin_masks(grid, pins or {}).items():
+        if i not in base:
+            raise ValueError(f"Pinned cell ({i % grid.width}, {i // grid.width}) is outside the region")
+        base[i] = mask
+
+    constraints = patch_constraints(grid, base, _CollapsedIds(grid.cells), x0, y0, w, h)
+    patch = None
+    if constraints is not None:
+        for attempt in range(retries):
+            patch = generate_patch(grid.ruleset, w, h, constraints,
+                                   derive_seed(seed, x0, y0, w, h, attempt),
+                                   grid.propagation, grid.heuristic, max_backtracks)
+            if patch is not None:
+                break
+    if patch is None:
+        raise ContradictionError(x0, y0, f"Could not re-collapse the {w}x{h} region at ({x0}, {y0})")
+
+    cells = grid.cells
+    writes = []
+    for k, i in enumerate(base):
+        mask = 1 << patch[k]
+        if cells[i] != mask:
+            writes.append((i, mask))
+    grid.overwrite(writes)
+
+    width = grid.width
+    changes = [(i % width, i // width, grid.mask_to_names(mask)) for i, mask in writes]
+    if map_interface is not None:
+        map_interface.update_cells(changes)
+    return changes
+
+
+def _region_cells(grid, x0, y0, w, h):
+    """Cell indices of the rectangle in the patch's row-major order."""
+    width = grid.width
+    return [(y0 + ly) * width + x0 + lx for ly in range(h) for lx in range(w)]
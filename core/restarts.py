@@ -0,0 +1,140 @@
+# core/restarts.py
+
+# Race independently seeded collapse attempts across a process pool.
+#
+# Attempt k always uses the k-th seed derived from the master seed, and the
+# winner is the lowest-numbered attempt that succeeds, so the result does not
+# depend on which worker happens to finish first. As soon as attempt k
+# succeeds, every attempt numbered above k is told to stop.
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.rng import derive_seed
+from core.wave import ContradictionError, Wave
+from core.wfc import collapse_with_backtracking, propagate
+
+# How many observations a worker makes between checks for cancellation
+CANCEL_CHECK_INTERVAL = 64
+
+_best_attempt = None
+
+
+def _init_worker(best_attempt):
+    global _best_attempt
+    _best_attempt = best_attempt
+
+
+def _cancelled(index):
+    return _best_attempt is not None and _best_attempt.value < index
+
+
+def attempt_seeds(seed, attempts):
+    """The seed used by each attempt, derived from the master seed."""
+    return [derive_seed(seed, "attempt", k) for k in range(attempts)]
+
+
+def _wave_state(grid):
+    return (grid.width, grid.height, grid.ruleset, grid.propagation,
+            grid.heuristic, grid.topology, grid.depth, grid.cells[:])
+
+
+def _rebuild_wave(state, seed):
+    w, h, ruleset, propagation, heuristic, topology, depth, cells = state
+    grid = Wave(w, h, ruleset, propagation, heuristic, seed, topology, depth)
+    full = grid.full_mask
+    for i, mask in enumerate(cells):
+        if mask != full:
+            grid.restrict(i, mask)
+    return grid
+
+
+def _run_attempt(index, seed, state, backtrack, max_backtracks):
+    """Worker entry point: returns the collapsed cells, or None on failure.
+
+    Every CANCEL_CHECK_INTERVAL observations the attempt checks whether a
+    lower-numbered attempt has already succeeded, and gives up if so.
+    """
+    grid = _rebuild_wave(state, seed)
+    try:
+        if not propagate(grid):
+            return None
+        if backtrack:
+            steps = 0
+
+            def should_stop():
+                nonlocal steps
+                steps += 1
+                return steps % CANCEL_CHECK_INTERVAL == 0 and _cancelled(index)
+
+            if collapse_with_backtracking(grid, max_backtracks, should_stop) is None:
+                return None
+            return grid.cells
+
+        steps = 0
+        while True:
+            i = grid.entropy.peek()
+            if i is None:
+                return grid.cells
+            steps += 1
+            if steps % CANCEL_CHECK_INTERVAL == 0 and _cancelled(index):
+                return None
+            # By flat index, so cells in every layer of a voxel wave are reachable
+            grid.restrict(i, 1 << grid.ruleset.sample(grid.cells[i], grid.rng))
+            if not propagate(grid):
+                return None
+    except ContradictionError:
+        return None
+
+
+def race_restarts(grid, attempts, seed=None, max_workers=None,
+                  backtrack=False, max_backtracks=1000):
+    """Collapse grid by racing `attempts` seeded runs in worker processes.
+
+    grid is filled in place from the winning attempt, and its index is
+    returned. Raises ContradictionError if every attempt fails.
+    """
+    if seed is None:
+        seed = grid.rng.getrandbits(64)
+    seeds = attempt_seeds(seed, attempts)
+    state = _wave_state(grid)
+
+    best_attempt = multiprocessing.Value("i", attempts)
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(best_attempt,)
+    )
+    try:
+        futures = {
+            executor.submit(_run_attempt, k, seeds[k], state, backtrack, max_backtracks): k
+            for k in range(attempts)
+        }
+        results = {}
+        next_attempt = 0
+        winner = None
+        for future in as_completed(futures):
+            k = futures[future]
+            results[k] = future.result()
+            if results[k] is not None:
+                with best_attempt.get_lock():
+                    if k < best_attempt.value:
+                        best_attempt.value = k
+            # The winner is decided once every lower-numbered attempt is done
+            while next_attempt in results:
+                if results[next_attempt] is not None:
+                    winner = next_attempt
+                    break
+                next_attempt += 1
+            if winner is not None:
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if winner is None:
+        raise ContradictionError(None, None, f"All {attempts} collapse attempts failed")
+
+    for i, mask in enumerate(results[winner]):
+        grid.restrict(i, mask)
+    propagate(grid)
+    return winner
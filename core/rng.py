@@ -0,0 +1,24 @@
+# core/rng.py
+
+# Helpers for instance-local random number generators, so that generation
+# never touches the global `random` module state and a seed fully determines
+# the result, in this process or any other.
+
+import hashlib
+import random
+
+
+def make_rng(seed=None):
+    """random.Random for seed; an existing Random is passed through as is."""
+    if isinstance(seed, random.Random):
+        return seed
+    return random.Random(seed)
+
+
+def derive_seed(seed, *key):
+    """Stable 64-bit seed for a sub-task (a chunk, a tile, an attempt...).
+
+    Unlike hash(), the result is the same in every process and Python run.
+    """
+    data = repr((seed,) + key).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
@@ -0,0 +1,70 @@
+# core/stats.py
+
+# Opt-in instrumentation for generation.
+#
+# A wave carries stats=None unless GenerationStats are attached, and every
+# instrumented path tests that once per observation or propagate call, never
+# per cell. Attaching swaps in counting versions of the wave's queues and
+# ban callback, so the propagation loops themselves are unchanged.
+
+# Events hooks can subscribe to, and the arguments passed after the wave:
+#   "collapse"      - (i, t): cell i was observed as tile t
+#   "propagate"     - (ok,): a propagate call finished
+#   "contradiction" - (i,): cell i ran out of options
+#   "backtrack"     - (i, t): tile t was undone and banned at cell i
+EVENTS = ("collapse", "propagate", "contradiction", "backtrack")
+
+
+class GenerationStats:
+    """Counters, timers and hooks for the waves they are attached to.
+
+    bans counts individual tiles removed from cells and pushes counts
+    propagation queue entries (collapsed cells, or (cell, tile) bans in ac4
+    mode). select_time and propagate_time are seconds spent choosing and
+    sampling cells versus propagating.
+    """
+
+    def __init__(self):
+        self.collapses = 0
+        self.bans = 0
+        self.pushes = 0
+        self.contradictions = 0
+        self.backtracks = 0
+        self.select_time = 0.0
+        self.propagate_time = 0.0
+        self.hooks = {event: [] for event in EVENTS}
+
+    def on(self, event, fn):
+        """Call fn(wave, ...) whenever event happens; see EVENTS."""
+        if event not in self.hooks:
+            raise ValueError(f"Unknown event: {event!r}")
+        self.hooks[event].append(fn)
+
+    def emit(self, event, wave, *args):
+        for fn in self.hooks[event]:
+            fn(wave, *args)
+
+    def as_dict(self):
+        return {
+            "collapses": self.collapses,
+            "bans": self.bans,
+            "pushes": self.pushes,
+            "contradictions": self.contradictions,
+            "backtracks": self.backtracks,
+            "select_time": self.select_time,
+            "propagate_time": self.propagate_time,
+        }
+
+
+class CountingQueue(list):
+    """A list that counts appends into stats.pushes."""
+
+    __slots__ = ("stats",)
+
+    def __init__(self, items, stats):
+        super().__init__(items)
+        self.stats = stats
+
+    def append(self, item):
+        self.stats.pushes += 1
+        list.append(self, item)
@@ -1,5 +1,13 @@
 # core/tiles.py
 
+import bisect
+import functools
+import hashlib
+import math
+import random
+
+from core.topology import get_topology
+
 # Define tile types and adjacency rules
 
 TILES = {
@@ -49,14 +57,22 @@ TILES = {
     }
 }
 
+DIRECTIONS = {
+    "up":    (0, -1),
+    "down":  (0, 1),
+    "left":  (-1, 0),
+    "right": (1, 0)
+}
+
+OPPOSITE = {"up": "down", "down": "up", "left": "right", "right": "left"}
+
+CLOSURES = ("union", "intersection", "none", "strict")
+
 # Utility functions
 def get_tile_weight(tile_name):
     return TILES.get(tile_name, {}).get("weight", 1.0)
 
-def weighted_random_choice(possible_tiles):
-   
-    import random
-    
+def weighted_random_choice(possible_tiles, rng=random):
     if not possible_tiles:
         return None
     
@@ -64,4 +80,211 @@ def weighted_random_choice(possible_tiles):
     weights = [get_tile_weight(tile) for tile in possible_tiles]
     
     # Use weighted random choice
-    return random.choices(possible_tiles, weights=weights, k=1)[0]
\ No newline at end of file
+    return rng.choices(possible_tiles, weights=weights, k=1)[0]
+
+
+def _build_alias(weights):
+    """Vose alias table for O(1) sampling from the full weight distribution."""
+    n = len(weights)
+    total = sum(weights)
+    prob = [w * n / total for w in weights]
+    alias = list(range(n))
+    small = [t for t, p in enumerate(prob) if p < 1.0]
+    large = [t for t, p in enumerate(prob) if p >= 1.0]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        alias[s] = l
+        prob[l] -= 1.0 - prob[s]
+        (small if prob[l] < 1.0 else large).append(l)
+    for t in small + large:
+        prob[t] = 1.0
+    return tuple(prob), tuple(alias)
+
+
+def _mask_ids(mask):
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return tuple(ids)
+
+
+class Ruleset:
+    """Compiled, read-only form of a tileset.
+
+    Tiles are interned to ids 0..n-1 and rules become per-direction bitmasks:
+    compat[d][t] is the mask of tiles allowed in direction d of tile t.
+    Build one with compile_tileset() and share it between grids; nothing on it
+    is mutated after construction apart from the sampling cache.
+    """
+
+    # Bound on cached per-mask cumulative weight tables
+    CUMULATIVE_CACHE_SIZE = 4096
+
+    def __init__(self, names, weights, compat, directions=None, opposite=None):
+        self.names = tuple(names)
+        self.index = {name: t for t, name in enumerate(self.names)}
+        self.weights = tuple(float(w) for w in weights)
+        self.directions = tuple(directions or DIRECTIONS)
+        # opposite maps direction names to their opposites (default: OPPOSITE)
+        opposite = opposite or OPPOSITE
+        self.opposite = tuple(self.directions.index(opposite[d]) for d in self.directions)
+        self.compat = tuple(tuple(masks) for masks in compat)
+        self.full_mask = (1 << len(self.names)) - 1
+
+        self.compat_ids = tuple(tuple(_mask_ids(mask) for mask in masks) for masks in self.compat)
+        self.alias_prob, self.alias = _build_alias(self.weights)
+        self._cumulative = {}
+        self._digest = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_cumulative"] = {}
+        return state
+
+    def digest(self):
+        """Hex SHA-256 of the names, weights, directions and rules.
+
+        Equal digests mean the rulesets generate identical maps, so it can
+        key caches and tag saved maps.
+        """
+        digest = self._digest
+        if digest is None:
+            data = repr((self.names, self.weights, self.directions, self.compat)).encode()
+            digest = self._digest = hashlib.sha256(data).hexdigest()
+        return digest
+
+    def names_to_mask(self, names):
+        mask = 0
+        for name in names:
+            t = self.index.get(name)
+            if t is not None:
+                mask |= 1 << t
+        return mask
+
+    def mask_to_names(self, mask):
+        names = []
+        while mask:
+            low = mask & -mask
+            names.append(self.names[low.bit_length() - 1])
+            mask ^= low
+        return names
+
+    def sample(self, mask, rng=random):
+        """Pick a tile id from mask with probability proportional to weight."""
+        if mask == self.full_mask:
+            t = int(rng.random() * len(self.names))
+            return t if rng.random() < self.alias_prob[t] else self.alias[t]
+
+        table = self._cumulative.get(mask)
+        if table is None:
+            ids = []
+            cumulative = []
+            total = 0.0
+            m = mask
+            while m:
+                low = m & -m
+                t = low.bit_length() - 1
+                total += self.weights[t]
+                ids.append(t)
+                cumulative.append(total)
+                m ^= low
+            if len(self._cumulative) >= self.CUMULATIVE_CACHE_SIZE:
+                self._cumulative.clear()
+            table = self._cumulative[mask] = (ids, cumulative)
+
+        ids, cumulative = table
+        if not ids:
+            return None
+        k = bisect.bisect_right(cumulative, rng.random() * cumulative[-1])
+        return ids[min(k, len(ids) - 1)]
+
+
+def compile_tileset(tiles, closure="union", topology=None):
+    """Compile a TILES-style dict into a Ruleset.
+
+    Rules are keyed by the directions of topology (a name from
+    core.topology.TOPOLOGIES or a Topology; default "square", i.e. up, down,
+    left and right).
+
+    closure controls how one-sided rules are made symmetric, i.e. whether
+    b in a["rules"][d] must also imply a in b["rules"][opposite of d]:
+      "union"        - a pair is allowed if either tile's rules allow it
+      "intersection" - a pair is allowed only if both tiles' rules allow it
+      "none"         - use each tile's rules as written
+      "strict"       - raise ValueError if the rules are not symmetric
+
+    Raises ValueError for rules naming unknown tiles or directions, missing
+    directions, and non-positive weights.
+    """
+    if closure not in CLOSURES:
+        raise ValueError(f"Unknown closure mode: {closure!r}")
+    if not tiles:
+        raise ValueError("Tileset is empty")
+
+    topology = get_topology(topology)
+    names = list(tiles)
+    index = {name: t for t, name in enumerate(names)}
+    directions = list(topology.directions)
+
+    weights = []
+    for name in names:
+        weight = tiles[name].get("weight", 1.0)
+        if not (isinstance(weight, (int, float)) and math.isfinite(weight) and weight > 0):
+            raise ValueError(f"Tile {name!r} has invalid weight {weight!r}")
+        weights.append(weight)
+
+    compat = [[0] * len(names) for _ in directions]
+    for name in names:
+        rules = tiles[name].get("rules", {})
+        unknown_dirs = set(rules) - set(directions)
+        if unknown_dirs:
+            raise ValueError(f"Tile {name!r} has rules for unknown directions {sorted(unknown_dirs)}")
+        for d, direction in enumerate(directions):
+            if direction not in rules:
+                raise ValueError(f"Tile {name!r} has no rules for direction {direction!r}")
+            for other in rules[direction]:
+                if other not in index:
+                    raise ValueError(f"Tile {name!r} allows unknown tile {other!r} {direction}")
+                compat[d][index[name]] |= 1 << index[other]
+
+    if closure != "none":
+        opposite = [directions.index(topology.opposite[d]) for d in directions]
+        mirrored = [[0] * len(names) for _ in directions]
+        for d in range(len(directions)):
+            for t in range(len(names)):
+                for t2 in range(len(names)):
+                    if compat[opposite[d]][t2] >> t & 1:
+                        mirrored[d][t] |= 1 << t2
+        if closure == "strict":
+            for d, direction in enumerate(directions):
+                for t in range(len(names)):
+                    if compat[d][t] != mirrored[d][t]:
+                        raise ValueError(f"Rules for tile {names[t]!r} {direction} are not symmetric")
+        elif closure == "union":
+            compat = [[a | b for a, b in zip(row, mrow)] for row, mrow in zip(compat, mirrored)]
+        else:
+            compat = [[a & b for a, b in zip(row, mrow)] for row, mrow in zip(compat, mirrored)]
+
+    return Ruleset(names, weights, compat, directions, topology.opposite)
+
+
+@functools.lru_cache(maxsize=None)
+def _ruleset_for(tile_names):
+    subset = {}
+    for name in tile_names:
+        tile = dict(TILES[name])
+        tile["rules"] = {d: set(allowed) & set(tile_names) for d, allowed in tile["rules"].items()}
+        subset[name] = tile
+    return compile_tileset(subset)
+
+def get_ruleset(tile_names=None):
+    """Shared compiled Ruleset for TILES, or for a subset of its tile names."""
+    if tile_names is None:
+        tile_names = TILES
+    return _ruleset_for(tuple(tile_names))
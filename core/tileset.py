@@ -0,0 +1,138 @@
+# core/tileset.py
+
+# Tilesets defined in JSON or TOML files instead of the TILES literal.
+#
+# A file holds an optional topology and closure plus a table of tiles in the
+# TILES layout (sprite, color, weight, rules). A tile may also declare a
+# rotation symmetry, in which case its distinct quarter-turn rotations are
+# added as separate tiles with rotated rules. Expansion and compilation grow
+# with the square of the tile count, so the compiled result can be cached on
+# disk under the hash of the file's bytes and loaded back with one unpickle.
+
+import hashlib
+import json
+import os
+import pickle
+
+from core.tiles import compile_tileset
+from core.topology import get_topology
+
+# Bump when the expansion or the Ruleset layout changes, orphaning old caches
+CACHE_VERSION = 1
+
+# Distinct quarter-turn rotations for each of Gumin's symmetry letters.
+# Reflections are not generated, so "L" and "T" both give four tiles.
+SYMMETRIES = {"X": 1, "I": 2, "\\": 2, "L": 4, "T": 4}
+
+# Directions a quarter turn clockwise from each square direction
+_CLOCKWISE = {"up": "right", "right": "down", "down": "left", "left": "up"}
+
+
+def _variant_name(name, r, count):
+    r %= count
+    return name if r == 0 else f"{name}_r{r}"
+
+
+def _rotate(direction, r):
+    for _ in range(r):
+        direction = _CLOCKWISE[direction]
+    return direction
+
+
+def expand_rotations(tiles):
+    """Add the rotated variants of tiles that declare a symmetry.
+
+    A tile with symmetry "L" becomes name, name_r1, name_r2 and name_r3,
+    turned 0-3 quarter turns clockwise; each variant records its "rotation"
+    so renderers can turn the sprite. Rules may name either base tiles
+    (rotation 0) or variants, and are rotated along with the tile. Returns a
+    new TILES-style dict; tiles without a symmetry are copied as they are.
+    """
+    counts = {}
+    for name, tile in tiles.items():
+        symmetry = tile.get("symmetry", "X")
+        if symmetry not in SYMMETRIES:
+            raise ValueError(f"Tile {name!r} has unknown symmetry {symmetry!r}")
+        counts[name] = SYMMETRIES[symmetry]
+
+    # Every name a rule may use, as (base tile, rotation)
+    refs = {}
+    for name, count in counts.items():
+        for r in range(count):
+            refs[_variant_name(name, r, count)] = (name, r)
+
+    expanded = {}
+    for name, tile in tiles.items():
+        count = counts[name]
+        for r in range(count):
+            variant = {k: v for k, v in tile.items() if k != "symmetry"}
+            rules = {}
+            for direction, allowed in tile.get("rules", {}).items():
+                if count > 1 and direction not in _CLOCKWISE:
+                    raise ValueError(f"Tile {name!r} can only be rotated on a square grid")
+                rotated = set()
+                for ref in allowed:
+                    if ref not in refs:
+                        raise ValueError(f"Tile {name!r} allows unknown tile {ref!r} {direction}")
+                    other, s = refs[ref]
+                    rotated.add(_variant_name(other, s + r, counts[other]))
+                rules[_rotate(direction, r) if count > 1 else direction] = rotated
+            variant["rules"] = rules
+            if count > 1:
+                variant["rotation"] = r
+            expanded[_variant_name(name, r, count)] = variant
+    return expanded
+
+
+def parse_tileset(data):
+    """(tiles, topology, closure) from a decoded tileset file."""
+    if not isinstance(data.get("tiles"), dict):
+        raise ValueError("Tileset file has no tiles table")
+    topology = get_topology(data.get("topology"))
+    closure = data.get("closure", "union")
+    tiles = expand_rotations(data["tiles"])
+    return tiles, topology, closure
+
+
+def _decode(path, raw):
+    if path.endswith(".toml"):
+        import tomllib
+
+        return tomllib.loads(raw.decode("utf-8"))
+    if path.endswith(".json"):
+        return json.loads(raw)
+    raise ValueError(f"Tileset files must be .json or .toml: {path}")
+
+
+def load_tileset(path, cache_dir=None):
+    """Read a JSON or TOML tileset; returns (tiles, Ruleset).
+
+    tiles is the expanded TILES-style dict, for sprites and colours. With
+    cache_dir set, the pair is cached there under the hash of the file's
+    contents, so later loads of an unchanged file skip parsing, rotation
+    expansion and rule compilation.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    cache_path = None
+    if cache_dir is not None:
+        key = hashlib.sha256(b"%d\0%s\0" % (CACHE_VERSION, os.path.splitext(path)[1].encode()))
+        key.update(raw)
+        cache_path = os.path.join(cache_dir, key.hexdigest() + ".tileset")
+        try:
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+    tiles, topology, closure = parse_tileset(_decode(path, raw))
+    result = (tiles, compile_tileset(tiles, closure, topology))
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, cache_path)
+    return result
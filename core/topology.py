@@ -0,0 +1,123 @@
+# core/topology.py
+
+# Grid topologies: which cells neighbour which, and in what direction.
+#
+# A topology names its directions and their opposites, and turns a grid shape
+# into a flat neighbour table: neighbors[i] is a tuple of (direction index,
+# neighbour index) pairs. Tables are built once per shape and shared by every
+# wave of that shape, so propagation only ever indexes precomputed tuples.
+# Cells are numbered row-major, layer by layer: i = (z * height + y) * width + x.
+
+import functools
+
+
+class Topology:
+    """Base class; subclasses set directions/opposite and define offsets()."""
+
+    name = None
+    directions = ()
+    opposite = {}
+    # Whether neighbours wrap around the edges of the grid
+    periodic = False
+
+    def offsets(self, x, y, z):
+        """(dx, dy, dz) for each direction, in directions order."""
+        raise NotImplementedError
+
+    def neighbor_table(self, width, height, depth=1):
+        return _neighbor_table(self, width, height, depth)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name!r}>"
+
+
+class SquareTopology(Topology):
+    """4-connected rectangle; the layout TILES rules are written for."""
+
+    name = "square"
+    directions = ("up", "down", "left", "right")
+    opposite = {"up": "down", "down": "up", "left": "right", "right": "left"}
+    _offsets = ((0, -1, 0), (0, 1, 0), (-1, 0, 0), (1, 0, 0))
+
+    def offsets(self, x, y, z):
+        return self._offsets
+
+
+class PeriodicTopology(SquareTopology):
+    """Square grid whose opposite edges touch, for tileable output."""
+
+    name = "periodic"
+    periodic = True
+
+
+class HexTopology(Topology):
+    """Pointy-top hexagons stored in rows, odd rows shifted half a cell right."""
+
+    name = "hex"
+    directions = ("east", "west", "northeast", "northwest", "southeast", "southwest")
+    opposite = {
+        "east": "west", "west": "east",
+        "northeast": "southwest", "southwest": "northeast",
+        "northwest": "southeast", "southeast": "northwest",
+    }
+    _even = ((1, 0, 0), (-1, 0, 0), (0, -1, 0), (-1, -1, 0), (0, 1, 0), (-1, 1, 0))
+    _odd = ((1, 0, 0), (-1, 0, 0), (1, -1, 0), (0, -1, 0), (1, 1, 0), (0, 1, 0))
+
+    def offsets(self, x, y, z):
+        return self._odd if y % 2 else self._even
+
+
+class VoxelTopology(Topology):
+    """Stacked square layers, 6-connected, for multi-level maps."""
+
+    name = "voxel"
+    directions = ("up", "down", "left", "right", "above", "below")
+    opposite = {
+        "up": "down", "down": "up", "left": "right", "right": "left",
+        "above": "below", "below": "above",
+    }
+    _offsets = ((0, -1, 0), (0, 1, 0), (-1, 0, 0), (1, 0, 0), (0, 0, 1), (0, 0, -1))
+
+    def offsets(self, x, y, z):
+        return self._offsets
+
+
+TOPOLOGIES = {
+    topology.name: topology
+    for topology in (SquareTopology(), PeriodicTopology(), HexTopology(), VoxelTopology())
+}
+
+
+def get_topology(topology=None):
+    """A Topology from a name in TOPOLOGIES or an instance; default square."""
+    if topology is None:
+        return TOPOLOGIES["square"]
+    if isinstance(topology, Topology):
+        return topology
+    try:
+        return TOPOLOGIES[topology]
+    except KeyError:
+        raise ValueError(f"Unknown topology: {topology!r}") from None
+
+
+@functools.lru_cache(maxsize=16)
+def _neighbor_table(topology, width, height, depth):
+    table = []
+    wrap = topology.periodic
+    for z in range(depth):
+        for y in range(height):
+            for x in range(width):
+                nbrs = []
+                for d, (dx, dy, dz) in enumerate(topology.offsets(x, y, z)):
+                    nx, ny, nz = x + dx, y + dy, z + dz
+                    if wrap:
+                        nx %= width
+                        ny %= height
+                        nz %= depth
+                    if 0 <= nx < width and 0 <= ny < height and 0 <= nz < depth:
+                        j = (nz * height + ny) * width + nx
+                        # A 1-wide periodic axis would make a cell its own neighbour
+                        if j != (z * height + y) * width + x:
+                            nbrs.append((d, j))
+                table.append(tuple(nbrs))
+    return tuple(table)
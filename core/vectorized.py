@@ -0,0 +1,156 @@
+# core/vectorized.py
+
+# Whole-grid NumPy propagation.
+#
+# The wave is viewed as a boolean array of shape (..., tiles, H, W); any
+# leading axes are independent waves. One sweep shifts the array one cell in
+# every direction, asks a precomputed support matrix which tiles each
+# neighbour still allows, and ANDs that into the wave; sweeps repeat until
+# nothing changes. That is full arc consistency, like the ac4 mode, but each
+# pass is a handful of array operations instead of a Python loop per cell.
+#
+# A sweep costs the same however few cells changed, so it only pays off for
+# bulk changes: the first propagate, pins, patch borders. Once few cells are
+# pending, as after a single observation, propagate_numpy hands off to a
+# local worklist that pushes each changed cell's whole mask to its
+# neighbours. Both reach the same unique arc-consistent fixed point.
+
+import numpy as np
+
+from core.tiles import DIRECTIONS
+
+# Masks are packed into uint64, so this backend handles at most 64 tiles
+MAX_TILES = 64
+
+# Sweep when at least 1/SWEEP_FRACTION of the cells are pending
+SWEEP_FRACTION = 16
+
+
+def support_matrices(ruleset):
+    """float32 array S of shape (D, T, T).
+
+    S[d, t, t2] is 1 when a neighbour in direction d holding t2 allows t
+    here, so S[d] @ neighbour_planes counts the support of every tile.
+    """
+    tile_count = len(ruleset)
+    support = np.zeros((len(ruleset.directions), tile_count, tile_count), dtype=np.float32)
+    for d in range(len(ruleset.directions)):
+        back = ruleset.opposite[d]
+        for t2 in range(tile_count):
+            for t in ruleset.compat_ids[back][t2]:
+                support[d, t, t2] = 1.0
+    return support
+
+
+def direction_offsets(ruleset):
+    return [DIRECTIONS[d] for d in ruleset.directions]
+
+
+def _slices(offset, height, width):
+    """Slices (cells, their neighbours) for cells that have a neighbour at offset."""
+    dx, dy = offset
+    cells = (slice(max(0, -dy), height - max(0, dy)), slice(max(0, -dx), width - max(0, dx)))
+    nbrs = (slice(max(0, dy), height - max(0, -dy)), slice(max(0, dx), width - max(0, -dx)))
+    return cells, nbrs
+
+
+def sweep(planes, support, offsets):
+    """Narrow planes in place to a fixed point; returns True if anything changed."""
+    height, width = planes.shape[-2:]
+    regions = [_slices(offset, height, width) for offset in offsets]
+    # Planes only ever lose bits, so an unchanged count means a fixed point
+    remaining = np.count_nonzero(planes)
+    start = remaining
+    while True:
+        for d, ((cy, cx), (ny, nx)) in enumerate(regions):
+            nbrs = planes[..., ny, nx]
+            flat = nbrs.reshape(nbrs.shape[:-2] + (-1,)).astype(np.float32)
+            planes[..., cy, cx] &= (support[d] @ flat).reshape(nbrs.shape) > 0
+        now = np.count_nonzero(planes)
+        if now == remaining:
+            return now != start
+        remaining = now
+
+
+def masks_to_planes(masks, tile_count, height, width):
+    bits = np.left_shift(np.uint64(1), np.arange(tile_count, dtype=np.uint64))
+    planes = (masks[..., None, :] & bits[:, None]) != 0
+    return planes.reshape(masks.shape[:-1] + (tile_count, height, width))
+
+
+def planes_to_masks(planes):
+    tile_count = planes.shape[-3]
+    bits = np.left_shift(np.uint64(1), np.arange(tile_count, dtype=np.uint64))
+    flat = planes.reshape(planes.shape[:-2] + (-1,))
+    return np.bitwise_or.reduce(np.where(flat, bits[:, None], np.uint64(0)), axis=-2)
+
+
+def propagate_numpy(grid):
+    """Propagate a Wave created with propagation="numpy" to arc consistency.
+
+    Sweeps the whole wave when many cells are pending, otherwise follows the
+    pending cells locally. Cells whose masks change are written back one by
+    one so the entropy index, undo trail and contradiction tracking stay in
+    step.
+    """
+    if grid.contradiction is not None:
+        return False
+    if not grid.pending:
+        return True
+    if len(grid.pending) * SWEEP_FRACTION < len(grid.cells):
+        return _propagate_local(grid)
+    grid.pending.clear()
+
+    cells = grid.cells
+    masks = np.fromiter(cells, dtype=np.uint64, count=len(cells))
+    planes = masks_to_planes(masks, len(grid.tile_names), grid.height, grid.width)
+    if not sweep(planes, grid.support_matrices, direction_offsets(grid.ruleset)):
+        return True
+
+    new_masks = planes_to_masks(planes)
+    trail = grid.trail
+    ban = grid.entropy.ban
+    for i in np.flatnonzero(new_masks != masks).tolist():
+        old = cells[i]
+        mask = int(new_masks[i])
+        if trail is not None:
+            trail.append((i, old))
+        cells[i] = mask
+        ban(i, old & ~mask)
+        if mask == 0 and grid.contradiction is None:
+            grid.contradiction = i
+    return grid.contradiction is None
+
+
+def _propagate_local(grid):
+    """Worklist arc consistency from the pending cells, for small changes."""
+    cells = grid.cells
+    compat = grid.compat
+    neighbors = grid.neighbors
+    pending = grid.pending
+    trail = grid.trail
+    ban = grid.entropy.ban
+    while pending:
+        i = pending.pop()
+        mask = cells[i]
+        for d, j in neighbors[i]:
+            rule = compat[d]
+            allowed = 0
+            m = mask
+            while m:
+                low = m & -m
+                allowed |= rule[low.bit_length() - 1]
+                m ^= low
+            opts = cells[j]
+            new_opts = opts & allowed
+            if new_opts != opts:
+                if trail is not None:
+                    trail.append((j, opts))
+                cells[j] = new_opts
+                ban(j, opts & ~new_opts)
+                if new_opts == 0:
+                    grid.contradiction = j
+                    pending.clear()
+                    return False
+                pending.append(j)
+    return True
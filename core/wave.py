@@ -0,0 +1,362 @@
+# core/wave.py
+
+# Compact wave storage: one integer bitmask of possible tile ids per cell,
+# stored in a flat row-major list. Tiles are interned to small ints so the
+# propagation loop only ever does integer and/or on masks.
+
+from array import array
+from core.tiles import Ruleset, get_ruleset
+from core.topology import get_topology
+from core.cell import CellView
+from core.entropy import HEURISTICS
+from core.rng import make_rng
+from core.stats import CountingQueue
+
+PROPAGATION_MODES = ("worklist", "ac4", "numpy")
+
+
+class ContradictionError(Exception):
+    """Raised when a cell is left with no possible tiles."""
+
+    def __init__(self, x, y, message=None, z=None):
+        if message is None:
+            where = f"{x}, {y}" if z is None else f"{x}, {y}, {z}"
+            message = f"Contradiction at ({where})"
+        super().__init__(message)
+        self.x = x
+        self.y = y
+        # Layer of the cell on multi-layer waves, else None
+        self.z = z
+
+
+class WaveRow:
+    """A single row of a Wave, indexable like the old list of Cells."""
+
+    __slots__ = ("wave", "y")
+
+    def __init__(self, wave, y):
+        self.wave = wave
+        self.y = y
+
+    def __len__(self):
+        return self.wave.width
+
+    def __getitem__(self, x):
+        if x < 0:
+            x += self.wave.width
+        if not 0 <= x < self.wave.width:
+            raise IndexError("wave column out of range")
+        return CellView(self.wave, self.y * self.wave.width + x)
+
+    def __iter__(self):
+        start = self.y * self.wave.width
+        for i in range(start, start + self.wave.width):
+            yield CellView(self.wave, i)
+
+
+class WaveLayer:
+    """One layer of a multi-layer Wave, indexable as layer[y][x]."""
+
+    __slots__ = ("wave", "z")
+
+    def __init__(self, wave, z):
+        self.wave = wave
+        self.z = z
+
+    def __len__(self):
+        return self.wave.height
+
+    def __getitem__(self, y):
+        if y < 0:
+            y += self.wave.height
+        if not 0 <= y < self.wave.height:
+            raise IndexError("wave row out of range")
+        # WaveRow only needs the row's offset, so rows of later layers simply
+        # continue the numbering past layer 0
+        return WaveRow(self.wave, self.z * self.wave.height + y)
+
+    def __iter__(self):
+        for y in range(self.wave.height):
+            yield self[y]
+
+
+class Wave:
+    """Bitmask-backed WFC grid with a grid[y][x] compatible view.
+
+    propagation selects how constraints spread:
+      "worklist" - push the rules of each newly collapsed cell to its neighbors
+      "ac4"      - keep per cell/tile/direction support counts and propagate
+                   every ban, including from partially constrained cells
+      "numpy"    - full arc consistency like ac4, but bulk changes sweep the
+                   whole wave as a (tiles, H, W) boolean array, and the few
+                   cells one observation changes are followed locally; see
+                   core.vectorized
+
+    heuristic selects how the next cell to observe is chosen:
+      "entropy"  - lowest Shannon entropy of the remaining tile weights
+      "count"    - fewest remaining tiles
+
+    seed (an int or a random.Random) drives every random choice made for
+    this wave, so equal seeds give equal maps.
+
+    topology (see core.topology) decides which cells neighbour each other and
+    must have the same directions as the ruleset; depth > 1 stacks layers for
+    the voxel topology. grid[y][x] views layer 0, layer(z) any layer.
+    """
+
+    def __init__(self, w, h, tiles, propagation="worklist", heuristic="entropy", seed=None,
+                 topology=None, depth=1):
+        if propagation not in PROPAGATION_MODES:
+            raise ValueError(f"Unknown propagation mode: {propagation!r}")
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic: {heuristic!r}")
+        self.propagation = propagation
+        self.rng = make_rng(seed)
+        self.width = w
+        self.height = h
+        self.depth = depth
+        self.topology = get_topology(topology)
+
+        # tiles is a compiled Ruleset or a list of names from TILES
+        self.ruleset = tiles if isinstance(tiles, Ruleset) else get_ruleset(tiles)
+        self.tile_names = self.ruleset.names
+        self.tile_index = self.ruleset.index
+        self.full_mask = self.ruleset.full_mask
+        self.weights = self.ruleset.weights
+        self.directions = self.ruleset.directions
+        self.opposite = self.ruleset.opposite
+        self.compat = self.ruleset.compat
+        self.compat_ids = self.ruleset.compat_ids
+        if self.directions != self.topology.directions:
+            raise ValueError(f"Ruleset directions {self.directions} do not match "
+                             f"the {self.topology.name} topology")
+
+        # neighbors[i]: tuple of (direction index, neighbor index), shared
+        # between every wave of the same topology and shape
+        self.neighbors = self.topology.neighbor_table(w, h, depth)
+
+        self.cells = [self.full_mask] * (w * h * depth)
+        # Collapsed cells whose rules have not been pushed to their neighbors
+        self.pending = []
+        # (cell, tile) bans not yet propagated, ac4 mode only
+        self.bans = []
+        # First cell left with no options, or None while the wave is consistent
+        self.contradiction = None
+        # Undo trail of (cell, previous mask), and of processed ac4 bans.
+        # Both stay None until start_trail() so plain runs pay nothing.
+        self.trail = None
+        self.support_trail = None
+        # GenerationStats, or None while instrumentation is off
+        self.stats = None
+        # core.constraints.TileQuotas, or None while no quotas apply
+        self.constraints = None
+        if propagation == "ac4":
+            self._init_support()
+        elif propagation == "numpy":
+            from core.vectorized import MAX_TILES, support_matrices
+            if self.topology.name != "square" or depth != 1:
+                raise ValueError("numpy propagation supports only the square topology")
+            if len(self.tile_names) > MAX_TILES:
+                raise ValueError(f"numpy propagation supports at most {MAX_TILES} tiles")
+            self.support_matrices = support_matrices(self.ruleset)
+            # Every cell is new, so the first propagate sweeps the whole wave
+            self.pending.extend(range(len(self.cells)))
+        self.heuristic = heuristic
+        self.entropy = HEURISTICS[heuristic](self)
+
+    def _init_support(self):
+        """Build the AC-4 support counters.
+
+        support[(i * T + t) * D + d] counts the tiles still possible in the
+        neighbor of cell i in direction d whose rules allow t at cell i.
+        Tiles that start with no support are banned right away.
+        """
+        tile_count = len(self.tile_names)
+        dir_count = len(self.directions)
+
+        base = [0] * (tile_count * dir_count)
+        for d in range(dir_count):
+            back = self.opposite[d]
+            for t2 in range(tile_count):
+                for t in self.compat_ids[back][t2]:
+                    base[t * dir_count + d] += 1
+        self.support = array("i", base) * len(self.cells)
+
+        unsupported = [(t, d) for t in range(tile_count) for d in range(dir_count)
+                       if base[t * dir_count + d] == 0]
+        if unsupported:
+            for i, nbrs in enumerate(self.neighbors):
+                dirs = {d for d, _ in nbrs}
+                for t, d in unsupported:
+                    if d in dirs and self.cells[i] >> t & 1:
+                        self.cells[i] &= ~(1 << t)
+                        self.bans.append((i, t))
+                if self.cells[i] == 0 and self.contradiction is None:
+                    self.contradiction = i
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        if y < 0:
+            y += self.height
+        if not 0 <= y < self.height:
+            raise IndexError("wave row out of range")
+        return WaveRow(self, y)
+
+    def __iter__(self):
+        for y in range(self.height):
+            yield WaveRow(self, y)
+
+    def layer(self, z):
+        """grid[y][x] view of layer z (z = 0 is the wave itself)."""
+        if not 0 <= z < self.depth:
+            raise IndexError("wave layer out of range")
+        return WaveLayer(self, z)
+
+    def names_to_mask(self, names):
+        return self.ruleset.names_to_mask(names)
+
+    def mask_to_names(self, mask):
+        return self.ruleset.mask_to_names(mask)
+
+    def restrict(self, i, mask):
+        """Narrow cell i's options to mask and queue the change for propagate."""
+        old = self.cells[i]
+        mask &= old
+        if mask == old:
+            return
+        if self.trail is not None:
+            self.trail.append((i, old))
+        self.cells[i] = mask
+        removed = old & ~mask
+        self.entropy.ban(i, removed)
+        if mask == 0 and self.contradiction is None:
+            self.contradiction = i
+        if self.propagation == "ac4":
+            while removed:
+                low = removed & -removed
+                self.bans.append((i, low.bit_length() - 1))
+                removed ^= low
+        elif self.propagation == "numpy" or (mask and mask & (mask - 1) == 0):
+            self.pending.append(i)
+
+    def overwrite(self, changes):
+        """Set cells to new masks outright, widening them if need be.
+
+        changes holds (cell, mask) pairs. Unlike restrict(), nothing is
+        propagated or recorded on the undo trail, so the caller must supply
+        consistent masks on a fully propagated wave. In ac4 mode the support
+        counters around the changed cells are recomputed, and tile quotas
+        are recounted.
+        """
+        cells = self.cells
+        touched = []
+        for i, mask in changes:
+            old = cells[i]
+            if mask == old:
+                continue
+            cells[i] = mask
+            self.entropy.ban(i, old & ~mask)
+            self.entropy.unban(i, mask & ~old)
+            touched.append(i)
+        if self.propagation == "ac4" and touched:
+            self._refresh_support(touched)
+        if self.constraints is not None and touched:
+            self.constraints.recount(self)
+
+    def _refresh_support(self, touched):
+        """Recount the AC-4 support of the touched cells and their neighbors."""
+        tile_count = len(self.tile_names)
+        dir_count = len(self.directions)
+        # supporters[d][t]: tiles whose rules allow t on their opposite side
+        supporters = [[0] * tile_count for _ in range(dir_count)]
+        for d in range(dir_count):
+            back = self.opposite[d]
+            for t2 in range(tile_count):
+                for t in self.compat_ids[back][t2]:
+                    supporters[d][t] |= 1 << t2
+
+        cells = self.cells
+        support = self.support
+        refresh = set(touched)
+        for i in touched:
+            refresh.update(j for _, j in self.neighbors[i])
+        for i in refresh:
+            base = i * tile_count
+            for d, j in self.neighbors[i]:
+                mask = cells[j]
+                for t in range(tile_count):
+                    support[(base + t) * dir_count + d] = (mask & supporters[d][t]).bit_count()
+
+    def attach_stats(self, stats):
+        """Start counting into stats (a core.stats.GenerationStats)."""
+        self.stats = stats
+        self.pending = CountingQueue(self.pending, stats)
+        self.bans = CountingQueue(self.bans, stats)
+        ban = self.entropy.ban
+
+        def counted_ban(i, removed):
+            stats.bans += removed.bit_count()
+            ban(i, removed)
+
+        # Shadows the method on this index only, so waves without stats
+        # keep calling the plain one
+        self.entropy.ban = counted_ban
+
+    def is_collapsed(self, i):
+        mask = self.cells[i]
+        return mask != 0 and mask & (mask - 1) == 0
+
+    def start_trail(self):
+        """Start recording changes so they can be rolled back with undo()."""
+        if self.trail is None:
+            self.trail = []
+            if self.propagation == "ac4":
+                self.support_trail = []
+
+    def mark(self):
+        """Checkpoint to pass to undo()."""
+        return len(self.trail), len(self.support_trail or ())
+
+    def undo(self, mark):
+        """Roll every change since mark back, clearing any contradiction."""
+        trail_len, support_len = mark
+        cells = self.cells
+        trail = self.trail
+        unban = self.entropy.unban
+        while len(trail) > trail_len:
+            i, old = trail.pop()
+            restored = old & ~cells[i]
+            cells[i] = old
+            unban(i, restored)
+
+        support_trail = self.support_trail
+        if support_trail is not None:
+            support = self.support
+            tile_count = len(self.tile_names)
+            dir_count = len(self.directions)
+            while len(support_trail) > support_len:
+                j, t2 = support_trail.pop()
+                for d, i in self.neighbors[j]:
+                    back = self.opposite[d]
+                    base = i * tile_count
+                    for t in self.compat_ids[d][t2]:
+                        support[(base + t) * dir_count + back] += 1
+
+        self.pending.clear()
+        self.bans.clear()
+        self.contradiction = None
+
+    def position(self, i):
+        """(x, y, z) of flat cell index i."""
+        row, x = divmod(i, self.width)
+        z, y = divmod(row, self.height)
+        return x, y, z
+
+    def tile_at(self, x, y, z=0):
+        """Name of the tile at (x, y) of layer z, or None if not yet collapsed."""
+        mask = self.cells[(z * self.height + y) * self.width + x]
+        if mask and mask & (mask - 1) == 0:
+            return self.tile_names[mask.bit_length() - 1]
+        return None
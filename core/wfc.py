@@ -1,92 +1,349 @@
 # core/wfc.py
 
-import random
-from core.tiles import TILES
-from core.tiles import weighted_random_choice
-from core.cell import Cell
+import time
 
-def create_grid(w, h, tile_names):
-    return [[Cell(tile_names) for _ in range(w)] for _ in range(h)]
+from core.topology import get_topology
+from core.wave import ContradictionError, Wave
+
+def create_grid(w, h, tiles, propagation="worklist", heuristic="entropy", seed=None,
+                stats=None, topology=None, depth=1):
+    grid = Wave(w, h, tiles, propagation, heuristic, seed, topology, depth)
+    if stats is not None:
+        grid.attach_stats(stats)
+    propagate(grid)
+    return grid
 
 def get_lowest_entropy_cell(grid):
-    min_entropy = float('inf')
-    candidates = []
-    for y, row in enumerate(grid):
-        for x, cell in enumerate(row):
-            if not cell.collapsed:
-                entropy = len(cell.options)
-                if entropy < min_entropy:
-                    min_entropy = entropy
-                    candidates = [(x, y)]
-                elif entropy == min_entropy:
-                    candidates.append((x, y))
-    return random.choice(candidates) if candidates else None
+    i = grid.entropy.peek()
+    if i is None:
+        return None
+    x, y, z = grid.position(i)
+    return (x, y) if grid.depth == 1 else (x, y, z)
 
 def collapse_cell(cell):
-    cell.collapsed = True
-    selected_tile = weighted_random_choice(cell.options)
-    cell.options = [selected_tile]
-
-def get_neighbors(x, y, w, h):
-    directions = {
-        "up":    (0, -1),
-        "down":  (0, 1),
-        "left":  (-1, 0),
-        "right": (1, 0)
-    }
-    for dir, (dx, dy) in directions.items():
-        nx, ny = x + dx, y + dy
-        if 0 <= nx < w and 0 <= ny < h:
-            yield dir, nx, ny
+    wave = cell.wave
+    t = wave.ruleset.sample(wave.cells[cell.index], wave.rng)
+    if wave.stats is not None:
+        _count_collapse(wave, cell.index, t)
+    wave.restrict(cell.index, 1 << t)
+
+def _observe(grid):
+    """Collapse the lowest-entropy cell; returns (i, t), or None when done."""
+    stats = grid.stats
+    if stats is not None:
+        start = time.perf_counter()
+    i = grid.entropy.peek()
+    if i is None:
+        return None
+    t = grid.ruleset.sample(grid.cells[i], grid.rng)
+    if stats is not None:
+        stats.select_time += time.perf_counter() - start
+        _count_collapse(grid, i, t)
+    grid.restrict(i, 1 << t)
+    return i, t
+
+def _count_collapse(grid, i, t):
+    grid.stats.collapses += 1
+    grid.stats.emit("collapse", grid, i, t)
+
+def _note_backtrack(grid, i, t):
+    stats = grid.stats
+    if stats is not None:
+        stats.backtracks += 1
+        stats.emit("backtrack", grid, i, t)
+
+def get_neighbors(x, y, w, h, topology=None):
+    topology = get_topology(topology)
+    directions = topology.directions
+    for d, j in topology.neighbor_table(w, h)[y * w + x]:
+        yield directions[d], j % w, j // w
 
 def propagate(grid):
-    w, h = len(grid[0]), len(grid)
-    changed = True
-    while changed:
-        changed = False
-        for y in range(h):
-            for x in range(w):
-                cell = grid[y][x]
-                if not cell.collapsed:
-                    continue
-                tile_name = cell.options[0]
-                rules = TILES[tile_name]["rules"]
-
-                for dir, nx, ny in get_neighbors(x, y, w, h):
-                    neighbor = grid[ny][nx]
-                    if neighbor.collapsed:
-                        continue
-                    valid = rules[dir]
-                    new_opts = [opt for opt in neighbor.options if opt in valid]
-                    if set(new_opts) != set(neighbor.options):
-                        neighbor.options = new_opts
-                        changed = True
-                        if len(new_opts) == 1:
-                            collapse_cell(neighbor)
+    """Push the rules of newly collapsed cells out to their neighbors.
+
+    Works through grid.pending, so only cells around the latest collapses are
+    visited; a neighbor that collapses as a result is queued in turn.
+    Returns False, with grid.contradiction set, if a cell runs out of options.
+    """
+    if grid.stats is not None:
+        return _propagate_with_stats(grid)
+    if grid.constraints is not None:
+        return _propagate_with_constraints(grid)
+    if grid.propagation == "ac4":
+        return propagate_ac4(grid)
+    if grid.propagation == "numpy":
+        from core.vectorized import propagate_numpy
+        return propagate_numpy(grid)
+    if grid.contradiction is not None:
+        return False
+    cells = grid.cells
+    compat = grid.compat
+    neighbors = grid.neighbors
+    pending = grid.pending
+    trail = grid.trail
+    ban = grid.entropy.ban
+    while pending:
+        i = pending.pop()
+        mask = cells[i]
+        if mask == 0:
+            continue
+        t = mask.bit_length() - 1
+
+        for d, j in neighbors[i]:
+            opts = cells[j]
+            new_opts = opts & compat[d][t]
+            if new_opts != opts:
+                if trail is not None:
+                    trail.append((j, opts))
+                cells[j] = new_opts
+                ban(j, opts & ~new_opts)
+                if new_opts == 0:
+                    grid.contradiction = j
+                    pending.clear()
+                    return False
+                if new_opts & (new_opts - 1) == 0:
+                    pending.append(j)
+    return True
+
+def _propagate_with_stats(grid):
+    stats = grid.stats
+    start = time.perf_counter()
+    # Detach the stats for the nested call so it takes the plain path;
+    # bans and queue pushes are still counted by the wave itself
+    grid.stats = None
+    try:
+        ok = propagate(grid)
+    finally:
+        grid.stats = stats
+    stats.propagate_time += time.perf_counter() - start
+    stats.emit("propagate", grid, ok)
+    if not ok:
+        stats.contradictions += 1
+        stats.emit("contradiction", grid, grid.contradiction)
+    return ok
+
+def _propagate_with_constraints(grid):
+    constraints = grid.constraints
+    # Quota bans feed more propagation, so alternate until neither has work
+    grid.constraints = None
+    try:
+        while propagate(grid):
+            if not constraints.enforce(grid):
+                return False
+            if not (grid.pending or grid.bans):
+                return True
+        return False
+    finally:
+        grid.constraints = constraints
+
+def propagate_ac4(grid):
+    """Propagate queued bans by decrementing AC-4 support counters.
+
+    Banning tile t2 at cell j removes one unit of support from every tile its
+    rules allowed at each neighbor; a tile whose support hits zero is banned
+    in turn. Each ban is processed exactly once. Returns False, with
+    grid.contradiction set, as soon as a cell runs out of options.
+    """
+    if grid.contradiction is not None:
+        return False
+    cells = grid.cells
+    support = grid.support
+    bans = grid.bans
+    neighbors = grid.neighbors
+    compat_ids = grid.compat_ids
+    opposite = grid.opposite
+    trail = grid.trail
+    support_trail = grid.support_trail
+    ban = grid.entropy.ban
+    tile_count = len(grid.tile_names)
+    dir_count = len(grid.directions)
+    contradiction = None
+    while bans:
+        j, t2 = bans.pop()
+        for d, i in neighbors[j]:
+            back = opposite[d]
+            base = i * tile_count
+            for t in compat_ids[d][t2]:
+                k = (base + t) * dir_count + back
+                support[k] -= 1
+                if support[k] == 0 and cells[i] >> t & 1:
+                    old = cells[i]
+                    if trail is not None:
+                        trail.append((i, old))
+                    cells[i] = old & ~(1 << t)
+                    bans.append((i, t))
+                    ban(i, 1 << t)
+                    if old == 1 << t and contradiction is None:
+                        contradiction = i
+        # Only whole bans go on the trail, so undo re-increments exactly
+        # the counters that were decremented.
+        if support_trail is not None:
+            support_trail.append((j, t2))
+        if contradiction is not None:
+            grid.contradiction = contradiction
+            bans.clear()
+            return False
+    return True
+
+def _raise_contradiction(grid):
+    x, y, z = grid.position(grid.contradiction)
+    raise ContradictionError(x, y, z=z if grid.depth > 1 else None)
 
 def step(grid, render_fn):
-    pos = get_lowest_entropy_cell(grid)
-    if pos:
-        x, y = pos
-        collapse_cell(grid[y][x])
-        propagate(grid)
+    """Collapse one cell and redraw the whole grid; see iter_collapse for deltas."""
+    if _observe(grid) is not None:
+        if not propagate(grid):
+            _raise_contradiction(grid)
         render_fn(grid)
     else:
         print("Collapse Complete.")
 
-def run_full_collapse(grid, render_fn):
-    while True:
-        pos = get_lowest_entropy_cell(grid)
-        if not pos:
-            break
-        x, y = pos
-        collapse_cell(grid[y][x])
-        propagate(grid)
-    render_fn(grid)
+def collapse_with_backtracking(grid, max_backtracks=1000, should_stop=None):
+    """Collapse every cell, undoing decisions that lead to a contradiction.
+
+    Each observation records a trail mark; on a contradiction the wave is
+    rolled back to the mark and the chosen tile is banned from that cell
+    instead, popping further decisions if that fails too. Returns the number
+    of backtracks taken, or raises ContradictionError once max_backtracks is
+    exceeded or every alternative is exhausted. should_stop, if given, is
+    called before each observation; once it returns True the collapse is
+    abandoned half-done and None is returned. The undo trail is switched
+    off again afterwards unless the caller had already started it.
+    """
+    owns_trail = grid.trail is None
+    grid.start_trail()
+    try:
+        if not propagate(grid):
+            _raise_contradiction(grid)
+
+        decisions = []
+        backtracks = 0
+        while True:
+            if should_stop is not None and should_stop():
+                return None
+            mark = grid.mark()
+            observed = _observe(grid)
+            if observed is None:
+                return backtracks
+            decisions.append((mark,) + observed)
+            while not propagate(grid):
+                if not decisions or backtracks >= max_backtracks:
+                    _raise_contradiction(grid)
+                backtracks += 1
+                mark, i, t = decisions.pop()
+                _note_backtrack(grid, i, t)
+                grid.undo(mark)
+                grid.restrict(i, grid.cells[i] & ~(1 << t))
+    finally:
+        if owns_trail:
+            grid.trail = None
+            grid.support_trail = None
+
+def iter_collapse(grid, backtrack=False, max_backtracks=1000):
+    """Collapse grid one observation at a time, yielding what each one changed.
+
+    Every item is a list of (x, y, options) for the cells whose options
+    changed since the previous item, where options are the remaining tile
+    names; the first item covers the initial propagation if it narrowed
+    anything. Multi-layer waves report (x, y, z, options) instead. With backtrack=True, observations that roll earlier decisions
+    back are reported the same way. Raises ContradictionError, after yielding
+    the failing step, exactly where run_full_collapse would.
+    """
+    owns_trail = grid.trail is None
+    grid.start_trail()
+    trail = grid.trail
+    width = grid.width
+    cells = grid.cells
+    mask_to_names = grid.mask_to_names
+
+    if grid.depth == 1:
+        def changes(dirty):
+            return [(j % width, j // width, mask_to_names(cells[j])) for j in sorted(dirty)]
+    else:
+        def changes(dirty):
+            return [grid.position(j) + (mask_to_names(cells[j]),) for j in sorted(dirty)]
+
+    decisions = []
+    backtracks = 0
+    dirty = set()
+    start = len(trail)
+    try:
+        ok = propagate(grid)
+        while True:
+            dirty.update(j for j, _ in trail[start:])
+            start = len(trail)
+            if not ok:
+                if not backtrack or not decisions or backtracks >= max_backtracks:
+                    yield changes(dirty)
+                    _raise_contradiction(grid)
+                backtracks += 1
+                mark, i, t = decisions.pop()
+                _note_backtrack(grid, i, t)
+                dirty.update(j for j, _ in trail[mark[0]:])
+                grid.undo(mark)
+                start = len(trail)
+                grid.restrict(i, cells[i] & ~(1 << t))
+                ok = propagate(grid)
+                continue
+
+            if dirty:
+                yield changes(dirty)
+                dirty = set()
+            if owns_trail and not backtrack:
+                # Nothing will be undone, so only the latest step is needed
+                trail.clear()
+                if grid.support_trail is not None:
+                    grid.support_trail.clear()
+                start = 0
+
+            mark = grid.mark()
+            observed = _observe(grid)
+            if observed is None:
+                return
+            if backtrack:
+                decisions.append((mark,) + observed)
+            ok = propagate(grid)
+    finally:
+        if owns_trail:
+            grid.trail = None
+            grid.support_trail = None
+
+def run_full_collapse(grid, render_fn=None, backtrack=False, max_backtracks=1000,
+                      restarts=None, seed=None, max_workers=None,
+                      parallel=False, tile_size=64, walkable=None):
+    """Collapse every cell of grid, then hand it to render_fn if given.
+
+    With restarts=K, K independently seeded attempts race across a process
+    pool and the first success (by attempt number, so the same seed always
+    gives the same map) is copied into grid; see core.restarts.
+    With parallel=True the grid is split into tile_size squares collapsed
+    concurrently in a checkerboard schedule; see core.parallel.
+    Tile quotas (core.constraints) hold only for the serial collapses.
+    With walkable=[tile names], the walkable cells are then joined into one
+    connected region; see core.connectivity.
+    """
+    if grid.constraints is not None and (parallel or restarts):
+        raise ValueError("Tile quotas cannot be combined with restarts or parallel collapse")
+    if parallel:
+        from core.parallel import collapse_parallel
+        collapse_parallel(grid, tile_size, seed, max_workers, max_backtracks)
+    elif restarts:
+        from core.restarts import race_restarts
+        race_restarts(grid, restarts, seed, max_workers, backtrack, max_backtracks)
+    elif backtrack:
+        collapse_with_backtracking(grid, max_backtracks)
+    else:
+        while _observe(grid) is not None:
+            if not propagate(grid):
+                _raise_contradiction(grid)
+    if walkable is not None:
+        from core.connectivity import connect_walkable
+        connect_walkable(grid, walkable, max_backtracks=max_backtracks)
+    if render_fn is not None:
+        render_fn(grid)
 
 def is_fully_collapsed(grid):
-    for row in grid:
-        for cell in row:
-            if not cell.collapsed:
-                return False
+    for mask in grid.cells:
+        if mask == 0 or mask & (mask - 1):
+            return False
     return True
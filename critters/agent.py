@@ -1,4 +1,5 @@
 from typing import Dict, List, Any, Optional, Tuple
+import random
 import pygame
 from .world_state import WorldState
 from .map_interface import WFCMapInterface
@@ -7,9 +8,12 @@ from .pathfinding import AStarPathfinder
 class GOAPAgent:
 
     def __init__(self, agent_id: str, start_position: Tuple[int, int],
-                 map_interface: WFCMapInterface, sprite_path: str = None):
+                 map_interface: WFCMapInterface, sprite_path: str = None,
+                 seed: Optional[int] = None):
         self.agent_id = agent_id
         self.map_interface = map_interface
+        # Per-agent RNG so behaviour is reproducible from a seed
+        self.rng = random.Random(seed)
         self.pathfinder = AStarPathfinder(map_interface)
 
         # World state
@@ -1,5 +1,15 @@
 from typing import Dict, List, Tuple, Set, Any, Optional
 
+# Tile type keywords agents can walk on; anything else (water, void) blocks
+WALKABLE_TYPES = {
+    'grass', 'dirt', 'path', 'stone', 'floor', 'ground',
+    'sand'
+}
+
+def is_walkable_type(tile_type: str) -> bool:
+    tile_type = tile_type.lower()
+    return any(walkable in tile_type for walkable in WALKABLE_TYPES)
+
 class WFCMapInterface:
 
     def __init__(self, wfc_map_data: List[List[Any]], tile_size: int = 64):
@@ -21,6 +31,9 @@ class WFCMapInterface:
         tile = self.get_tile_at(grid_x, grid_y)
         if tile is None:
             return "void"
+        if getattr(tile, 'collapsed', True) is False:
+            # Not generated yet: matches no walkable or resource keyword
+            return "ungenerated"
         if hasattr(tile, 'collapsed') and tile.collapsed and hasattr(tile, 'options'):
             return tile.options[0].lower()
         elif hasattr(tile, 'name'):
@@ -40,13 +53,7 @@ class WFCMapInterface:
     def is_walkable(self, grid_x: int, grid_y: int) -> bool:
         if not self.is_valid_position(grid_x, grid_y):
             return False
-        tile_type = self.get_tile_type(grid_x, grid_y)
-
-        walkable_types = {
-            'grass', 'dirt', 'path', 'stone', 'floor', 'ground',
-            'sand'
-        }
-        return any(walkable in tile_type for walkable in walkable_types)
+        return is_walkable_type(self.get_tile_type(grid_x, grid_y))
 
     def has_resource(self, grid_x: int, grid_y: int, resource_type: str) -> bool:
 
@@ -130,6 +137,19 @@ class WFCMapInterface:
                     if self.has_resource(x, y, resource_type):
                         self._resource_cache[resource_type].append((x, y))
 
+    def update_cells(self, changes):
+        """Refresh cached data for changed cells only.
+
+        changes holds (x, y, ...) tuples, e.g. one step of
+        core.wfc.iter_collapse, for cells that changed in map_data.
+        """
+        if self._resource_cache is None or not changes:
+            return
+        changed = {(x, y) for x, y, *_ in changes}
+        for resource_type, positions in self._resource_cache.items():
+            positions[:] = [pos for pos in positions if pos not in changed]
+            positions.extend(pos for pos in changed if self.has_resource(*pos, resource_type))
+
     def clear_cache(self):
         self._resource_cache = None
         self._walkable_cache = None
\ No newline at end of file
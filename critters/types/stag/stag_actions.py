@@ -1,4 +1,3 @@
-import random
 import math
 from typing import Tuple, Optional, List
 from ...actions import Action, ActionState
@@ -38,8 +37,8 @@ class WanderAction(Action):
         max_attempts = 20
         
         while attempts < max_attempts:
-            angle = random.uniform(0, 2 * math.pi)
-            distance = random.uniform(2, self.max_wander_distance)
+            angle = agent.rng.uniform(0, 2 * math.pi)
+            distance = agent.rng.uniform(2, self.max_wander_distance)
             
             dx = int(distance * math.cos(angle))
             dy = int(distance * math.sin(angle))
@@ -189,8 +188,8 @@ class FleeAction(Action):
         threat_dy = current_pos[1] - threat_pos[1]
         
         if threat_dx == 0 and threat_dy == 0:
-            threat_dx = random.choice([-1, 1])
-            threat_dy = random.choice([-1, 1])
+            threat_dx = agent.rng.choice([-1, 1])
+            threat_dy = agent.rng.choice([-1, 1])
         
         flee_length = math.sqrt(threat_dx * threat_dx + threat_dy * threat_dy)
         if flee_length > 0:
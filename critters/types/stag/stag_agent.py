@@ -1,5 +1,5 @@
 import pygame
-from typing import Tuple
+from typing import Optional, Tuple
 from ...agent import GOAPAgent
 from ...animation import AnimationSystem
 from ...planner import GOAPPlanner
@@ -9,8 +9,10 @@ from ...actions import ActionState
 class StagAgent(GOAPAgent):
     """Animated stag agent with wandering and resting behaviors."""
     
-    def __init__(self, start_position: Tuple[int, int], map_interface, asset_path: str = "assets"):
-        super().__init__(f"stag_{start_position[0]}_{start_position[1]}", start_position, map_interface)
+    def __init__(self, start_position: Tuple[int, int], map_interface, asset_path: str = "assets",
+                 seed: Optional[int] = None):
+        super().__init__(f"stag_{start_position[0]}_{start_position[1]}", start_position, map_interface,
+                         seed=seed)
         
         self.animation_system = AnimationSystem("stag", asset_path)
         self.planner = GOAPPlanner()
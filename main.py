@@ -1,25 +1,34 @@
 from core.tiles import TILES
-from core.wfc import create_grid, get_lowest_entropy_cell, collapse_cell, propagate
+from core.mapcache import MapCache
+from core.background import BackgroundGenerator
 from render.pygame_render import render
 from critters.types.stag import StagAgent
 from critters import WFCMapInterface
+from critters.map_interface import is_walkable_type
 import pygame
 from render.pygame_render import handle_camera_movement, calculate_camera_offset
 
-def main():
+# Maps are cached by seed, so a fixed seed skips generation after the first run
+MAP_SEED = 0
+MAP_CACHE_DIR = ".map_cache"
+
+def main(seed=MAP_SEED):
     width, height = 40, 40
     tile_names = list(TILES.keys())
-    grid = create_grid(width, height, tile_names)
+    # One connected walkable region, so paths from the spawn never dead-end
+    walkable = [name for name in tile_names if is_walkable_type(name)]
     
-    print("Generating WFC map...")
-    while True:
-        pos = get_lowest_entropy_cell(grid)
-        if not pos:
-            print("Collapse Complete.")
-            break
-        x, y = pos
-        collapse_cell(grid[y][x])
-        propagate(grid)
+    cache = MapCache(MAP_CACHE_DIR)
+    grid = cache.find(tile_names, width, height, seed, backtrack=True, walkable=walkable)
+    generator = None
+    if grid is None:
+        # Generate while the game starts; cells appear as they are collapsed
+        print("Generating WFC map in the background...")
+        generator = BackgroundGenerator(tile_names, width, height, seed, backtrack=True,
+                                        walkable=walkable)
+        grid = generator.map
+    else:
+        print("Loaded cached map.")
     
     print("Initializing pygame...")
     pygame.init()
@@ -29,7 +38,7 @@ def main():
     
     print("Creating map interface and stag...")
     map_interface = WFCMapInterface(grid, tile_size=64)
-    stag = StagAgent((width//2, height//2), map_interface)
+    stag = StagAgent((width//2, height//2), map_interface, seed=seed)
     stag.enable_debug(True)
     
     # Initialize camera system
@@ -62,6 +71,15 @@ def main():
                 if event.key == pygame.K_ESCAPE:
                     running = False
         
+        if generator is not None:
+            map_interface.update_cells(generator.poll())
+            if generator.done:
+                print("Collapse Complete.")
+                if seed is not None:
+                    cache.put(generator.map.to_array(), tile_names, width, height, seed,
+                              backtrack=True, walkable=walkable)
+                generator = None
+
         stag.update(dt)
         if hasattr(stag, 'animation_system'):
             print(f"Animation: {stag.animation_system.current_state}")
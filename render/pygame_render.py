@@ -6,6 +6,11 @@ TILE_WIDTH = 32       # Base tile width
 TILE_HEIGHT = 16      # Base tile height (typically half of width for isometric)
 TILE_SPRITE_HEIGHT = 32  # Actual sprite height (may be taller for 3D effect)
 CAMERA_SPEED = 5      # pixels per frame when moving camera
+CULL_RADIUS = 50      # grid distance from the camera centre that is drawn
+BACKGROUND = (50, 50, 50)
+# Lowest and highest offsets calculate_tile_elevation can give a sprite
+MIN_ELEVATION = -24   # stone surrounded by 8 stones
+MAX_ELEVATION = 10    # water
 
 def grid_to_screen(grid_x, grid_y, tile_width=TILE_WIDTH, tile_height=TILE_HEIGHT, offset_x=0, offset_y=0):
     """Convert grid coordinates to isometric screen coordinates with camera offset"""
@@ -70,12 +75,10 @@ def get_render_order(grid, camera_offset_x, camera_offset_y, screen_width, scree
     screen_center_y = screen_height / 2
     camera_center_x, camera_center_y = screen_to_grid(screen_center_x, screen_center_y, offset_x=camera_offset_x, offset_y=camera_offset_y)
     
-    cull_radius = 50
-
     for y in range(height):
         for x in range(width):
             distance = abs(x - camera_center_x) + abs(y - camera_center_y)
-            if distance <= cull_radius:
+            if distance <= CULL_RADIUS:
                 tiles.append((x, y))
     
     tiles.sort(key=lambda pos: (pos[0] + pos[1], pos[1]))
@@ -208,29 +211,92 @@ def _render_frame(grid, screen, camera_offset, tile_images):
     camera_offset_x, camera_offset_y = camera_offset
     screen_width, screen_height = screen.get_size()
     
-    screen.fill((50, 50, 50))  # background color
+    screen.fill(BACKGROUND)
 
     # Get tiles in proper rendering order
     render_order = get_render_order(grid, camera_offset_x, camera_offset_y, screen_width, screen_height)
         
     for x, y in render_order:
-        cell = grid[y][x]
-        screen_x, screen_y = grid_to_screen(x, y, offset_x=camera_offset_x, offset_y=camera_offset_y)
-        # Adjust Y position for taller sprites
-        adjusted_y = screen_y - (TILE_SPRITE_HEIGHT - TILE_HEIGHT)
-        rect = pygame.Rect(screen_x, adjusted_y, TILE_WIDTH, TILE_SPRITE_HEIGHT)
-        
-        if cell.collapsed:
-            tile_name = cell.options[0]
-            image = tile_images.get(tile_name)
-            if image:
-                elevation = calculate_tile_elevation(grid, x, y)
-                adjusted_y = screen_y - (TILE_SPRITE_HEIGHT - TILE_HEIGHT) + elevation
-                rect = pygame.Rect(screen_x, adjusted_y, TILE_WIDTH, TILE_SPRITE_HEIGHT)
-                screen.blit(image, rect)
-            else:
-                # fallback: draw magenta rect if image missing
-                pygame.draw.rect(screen, (255, 0, 255), rect)
+        _draw_cell(grid, screen, x, y, camera_offset_x, camera_offset_y, tile_images)
+
+def render_changes(grid, screen, camera_offset, changes):
+    """Redraw only the cells in changes on top of the previous frame.
+
+    changes holds (x, y, ...) tuples, e.g. one step of core.wfc.iter_collapse.
+    Each changed cell's 8 neighbours are redrawn with it, since their
+    elevation depends on it. The screen area every redrawn cell can cover is
+    cleared and repainted, clipped to that area, with every cell overlapping
+    it in back-to-front order, so the result matches a full render.
+    """
+    global _TILE_IMAGES_CACHE
+    if _TILE_IMAGES_CACHE is None:
+        _TILE_IMAGES_CACHE = load_isometric_tiles()
+
+    height, width = len(grid), len(grid[0])
+    dirty = set()
+    for x, y, *_ in changes:
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    dirty.add((nx, ny))
+
+    camera_offset_x, camera_offset_y = camera_offset
+    screen_width, screen_height = screen.get_size()
+    center_x, center_y = screen_to_grid(screen_width / 2, screen_height / 2,
+                                        offset_x=camera_offset_x, offset_y=camera_offset_y)
+    screen_rect = screen.get_rect()
+    # Cells overlapping a cell's bounds lie within reach diagonals of it
+    reach = (TILE_SPRITE_HEIGHT + MAX_ELEVATION - MIN_ELEVATION) // (TILE_HEIGHT // 2) + 1
+    clip = screen.get_clip()
+    try:
+        for x, y in dirty:
+            area = _cell_bounds(x, y, camera_offset_x, camera_offset_y).clip(screen_rect)
+            if not area:
+                continue
+            overlapping = []
+            for s in range(-reach, reach + 1):
+                # Sprites one column apart on screen are adjacent, not overlapping
+                for d in (-1, 0, 1):
+                    if (s + d) % 2:
+                        continue
+                    nx, ny = x + (s + d) // 2, y + (s - d) // 2
+                    if (0 <= nx < width and 0 <= ny < height
+                            and abs(nx - center_x) + abs(ny - center_y) <= CULL_RADIUS
+                            and _cell_bounds(nx, ny, camera_offset_x, camera_offset_y).colliderect(area)):
+                        overlapping.append((nx, ny))
+            overlapping.sort(key=lambda pos: (pos[0] + pos[1], pos[1]))
+            screen.set_clip(area)
+            screen.fill(BACKGROUND, area)
+            for nx, ny in overlapping:
+                _draw_cell(grid, screen, nx, ny, camera_offset_x, camera_offset_y, _TILE_IMAGES_CACHE)
+    finally:
+        screen.set_clip(clip)
+
+def _cell_bounds(x, y, camera_offset_x, camera_offset_y):
+    """Screen rect a cell's sprite can cover at any elevation."""
+    screen_x, screen_y = grid_to_screen(x, y, offset_x=camera_offset_x, offset_y=camera_offset_y)
+    top = screen_y - (TILE_SPRITE_HEIGHT - TILE_HEIGHT) + MIN_ELEVATION
+    return pygame.Rect(screen_x, top, TILE_WIDTH, TILE_SPRITE_HEIGHT + MAX_ELEVATION - MIN_ELEVATION)
+
+def _draw_cell(grid, screen, x, y, camera_offset_x, camera_offset_y, tile_images):
+    cell = grid[y][x]
+    screen_x, screen_y = grid_to_screen(x, y, offset_x=camera_offset_x, offset_y=camera_offset_y)
+    # Adjust Y position for taller sprites
+    adjusted_y = screen_y - (TILE_SPRITE_HEIGHT - TILE_HEIGHT)
+    rect = pygame.Rect(screen_x, adjusted_y, TILE_WIDTH, TILE_SPRITE_HEIGHT)
+
+    if cell.collapsed:
+        tile_name = cell.options[0]
+        image = tile_images.get(tile_name)
+        if image:
+            elevation = calculate_tile_elevation(grid, x, y)
+            adjusted_y = screen_y - (TILE_SPRITE_HEIGHT - TILE_HEIGHT) + elevation
+            rect = pygame.Rect(screen_x, adjusted_y, TILE_WIDTH, TILE_SPRITE_HEIGHT)
+            screen.blit(image, rect)
         else:
-            # uncollapsed cell: gray rectangle
-            pygame.draw.rect(screen, (100, 100, 100), rect)
\ No newline at end of file
+            # fallback: draw magenta rect if image missing
+            pygame.draw.rect(screen, (255, 0, 255), rect)
+    else:
+        # uncollapsed cell: gray rectangle
+        pygame.draw.rect(screen, (100, 100, 100), rect)
\ No newline at end of file
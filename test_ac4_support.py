@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+from core.region import recollapse_region
+from core.stats import GenerationStats
+from core.tiles import DIRECTIONS, compile_tileset
+from core.wfc import create_grid, run_full_collapse
+
+COLOURS = ("red", "green", "blue")
+
+def colouring_ruleset():
+    """Neighbours must differ: contradiction-prone, so backtracking runs a lot."""
+    tiles = {
+        name: {"rules": {d: set(COLOURS) - {name} for d in DIRECTIONS}}
+        for name in COLOURS
+    }
+    return compile_tileset(tiles)
+
+def recount_support(grid):
+    """AC-4 support counters rebuilt from the current cells."""
+    tile_count = len(grid.tile_names)
+    dir_count = len(grid.directions)
+    expected = []
+    for i in range(len(grid.cells)):
+        nbrs = dict(grid.neighbors[i])
+        for t in range(tile_count):
+            for d in range(dir_count):
+                back = grid.opposite[d]
+                # Counters facing off the edge are never decremented
+                mask = grid.cells[nbrs[d]] if d in nbrs else grid.full_mask
+                expected.append(sum(1 for t2 in range(tile_count)
+                                    if mask >> t2 & 1 and t in grid.compat_ids[back][t2]))
+    return expected
+
+def test_support_after_backtracking():
+    """Counters rolled back through support_trail match a recount."""
+    ruleset = colouring_ruleset()
+    backtracks = 0
+    for seed in range(6):
+        stats = GenerationStats()
+        grid = create_grid(16, 16, ruleset, "ac4", seed=seed, stats=stats)
+        run_full_collapse(grid, backtrack=True)
+        backtracks += stats.backtracks
+        assert list(grid.support) == recount_support(grid), f"seed {seed}"
+    assert backtracks > 0, "no run backtracked, so undo was not exercised"
+
+def test_support_after_recollapse():
+    """Counters refreshed by overwrite() match a recount."""
+    ruleset = colouring_ruleset()
+    for seed in range(6):
+        grid = create_grid(16, 16, ruleset, "ac4", seed=seed)
+        run_full_collapse(grid, backtrack=True)
+        recollapse_region(grid, 4, 5, 6, 5, seed=seed)
+        assert list(grid.support) == recount_support(grid), f"seed {seed}"
+
+def main():
+    print("Testing AC-4 support counters...")
+    test_support_after_backtracking()
+    test_support_after_recollapse()
+    print("Support counter tests passed")
+
+if __name__ == "__main__":
+    main()
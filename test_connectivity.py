@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+import copy
+
+from core.connectivity import WalkableComponents
+from core.tiles import TILES, compile_tileset
+from core.wfc import create_grid, run_full_collapse
+
+WALKABLE = ["grass", "stone", "dirt"]
+
+def watery_ruleset():
+    """Stock tiles with heavy water, so maps start out as many islands."""
+    tiles = copy.deepcopy(TILES)
+    tiles["water"]["weight"] = 6.0
+    return compile_tileset(tiles)
+
+def test_walkable_connected():
+    """Every walkable cell is reachable after run_full_collapse(walkable=...)."""
+    ruleset = watery_ruleset()
+    for propagation in ("worklist", "ac4"):
+        for seed in range(8):
+            grid = create_grid(40, 40, ruleset, propagation, seed=seed)
+            run_full_collapse(grid, walkable=WALKABLE)
+            count = WalkableComponents(grid, WALKABLE).count
+            assert count == 1, f"{propagation} seed {seed}: {count} walkable regions"
+
+def main():
+    print("Testing walkable connectivity...")
+    test_walkable_connected()
+    print("Connectivity test passed")
+
+if __name__ == "__main__":
+    main()